@@ -1,17 +1,14 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 
-from app.auth.jwt import is_token_revoked_redis, verify_access_token
+from app.auth.jwt import is_token_revoked, verify_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    #Comprobar el token desde el fichero
+    # Un único decode por petición; Redis solo se consulta si el filtro local da positivo
     payload = verify_access_token(token)
-
-    #comprobar el token en redis
-    payload_redis = await is_token_revoked_redis(token)
-    if not payload or not payload_redis:
+    if not payload or await is_token_revoked(token, payload):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     return payload
 
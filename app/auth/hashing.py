@@ -1,7 +1,60 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
 from bcrypt import hashpw, gensalt, checkpw
+from fastapi import HTTPException
+
+from app.utils.metrics import metrics
+
+load_dotenv()
+
+# Coste de bcrypt y tamaño del pool dedicado (bcrypt libera el GIL, así que los hilos escalan con los núcleos)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 1)))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "64"))
+
+_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
 
 def hash_password(password: str) -> str:
-    return hashpw(password.encode('utf-8'), gensalt()).decode('utf-8')
+    return hashpw(password.encode('utf-8'), gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
\ No newline at end of file
+    return checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def needs_rehash(hashed_password: str) -> bool:
+    # Formato $2b$<coste>$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+def _timed(operation: str, func, *args):
+    # Tiempo de bcrypt dentro del hilo del pool, sin contar la espera en la cola
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        metrics.observe("bcrypt_duration_seconds", time.perf_counter() - start, {"operation": operation})
+
+async def _run_in_pool(operation: str, func, *args):
+    # Backpressure: si la cola del pool está llena se responde 503 de inmediato
+    global _pending
+    if _pending >= BCRYPT_MAX_PENDING:
+        raise HTTPException(status_code=503, detail="Authentication service busy, try again later", headers={"Retry-After": "1"})
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, _timed, operation, func, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool("hash", hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_pool("verify", verify_password, plain_password, hashed_password)
+
+def shutdown_hashing_pool():
+    _executor.shutdown(wait=False, cancel_futures=True)
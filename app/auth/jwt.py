@@ -1,9 +1,11 @@
 import os
+import uuid
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from jose import jwt, JWTError
 
-from app.db.redis_client import redis_client
+from app.auth.revocation import revocations, token_digest
+from app.auth.token_cache import token_cache
 
 load_dotenv()
 
@@ -13,21 +15,12 @@ ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS"))
 
-# Archivo para almacenar tokens revocados
-REVOKED_TOKENS_FILE = os.getenv("REVOKED_TOKENS_FILE")
-
-# Cargar tokens revocados desde el archivo
-revoked_tokens = set()
-if os.path.exists(REVOKED_TOKENS_FILE):
-    with open(REVOKED_TOKENS_FILE, "r") as file:
-        revoked_tokens = set(line.strip() for line in file)
-
 def create_access_token(data: dict, role: str, expires_minutes: int = None):
     to_encode = data.copy()
     if expires_minutes is None:
         expires_minutes = ACCESS_TOKEN_EXPIRE_MINUTES
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
-    to_encode.update({"exp": expire, "role": role})
+    to_encode.update({"exp": expire, "role": role, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def create_refresh_token(data: dict):
@@ -36,14 +29,21 @@ def create_refresh_token(data: dict):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
 
+def token_id(token: str, payload: dict) -> str:
+    # Los tokens emitidos antes de incluir `jti` se identifican por su digest
+    return payload.get("jti") or token_digest(token)
+
 def verify_access_token(token: str):
+    # Verifica firma y expiración; la revocación se comprueba aparte con is_token_revoked
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
-        if token in revoked_tokens:  # Verificar si el token está revocado
-            raise JWTError("Token has been revoked")
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    token_cache.put(token, payload)
+    return payload
 
 def verify_refresh_token(token: str):
     try:
@@ -52,22 +52,18 @@ def verify_refresh_token(token: str):
     except JWTError:
         return None
 
+async def is_token_revoked(token: str, payload: dict) -> bool:
+    # Solo se consulta Redis cuando el filtro Bloom local da positivo
+    return await revocations.is_revoked(token_id(token, payload), payload["exp"])
+
 def revoke_token(token: str):
-    # Revocar un token y almacenarlo en el archivo.
-    revoked_tokens.add(token)
-    with open(REVOKED_TOKENS_FILE, "a") as file:
-        file.write(f"{token}\n")
+    # Revocar un token en el registro local del proceso (y en el fichero si no hay Redis)
+    token_cache.evict(token)
+    payload = jwt.get_unverified_claims(token)
+    revocations.add(token_id(token, payload), payload["exp"])
 
 async def revoke_token_redis(token: str):
-    if redis_client:
-        expiration = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        await redis_client.set(token, "revoked", ex=expiration)
-
-async def is_token_revoked_redis(token: str) -> bool:
-    try:
-        if redis_client and await redis_client.exists(token) == 1:  # Verificar si el token está revocado en redis
-            raise JWTError("Token has been revoked")
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        return None
+    # Revocar un token en Redis y notificarlo al resto de procesos por pub/sub
+    token_cache.evict(token)
+    payload = jwt.get_unverified_claims(token)
+    await revocations.revoke(token_id(token, payload), payload["exp"])
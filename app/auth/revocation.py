@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import os
+import time
+from logging import getLogger
+from dotenv import load_dotenv
+from jose import jwt, JWTError
+
+from app.db.redis_client import redis_client
+from app.utils.metrics import metrics
+
+load_dotenv()
+
+logger = getLogger(__name__)
+
+REVOKED_TOKENS_FILE = os.getenv("REVOKED_TOKENS_FILE")
+REVOCATION_CHANNEL = os.getenv("REVOCATION_CHANNEL", "revoked_tokens")
+REVOCATION_KEY_PREFIX = "revoked:"
+REVOCATION_BLOOM_BITS = int(os.getenv("REVOCATION_BLOOM_BITS", str(1 << 20)))
+REVOCATION_BLOOM_HASHES = int(os.getenv("REVOCATION_BLOOM_HASHES", "7"))
+REVOCATION_BUCKET_SECONDS = int(os.getenv("REVOCATION_BUCKET_SECONDS", "3600"))
+# Antes de `jti` se revocaba el token completo: una línea con el JWT en el fichero y una clave con el
+# JWT como nombre en Redis. Todo JWT empieza por "eyJ" (cabecera JSON en base64url)
+LEGACY_TOKEN_PREFIX = "eyJ"
+
+def token_digest(token: str) -> str:
+    # Identificador de los tokens sin `jti` (ver token_id en app/auth/jwt.py)
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _legacy_token_exp(token: str):
+    try:
+        return int(jwt.get_unverified_claims(token)["exp"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+
+class BloomFilter:
+    def __init__(self, size_bits: int = REVOCATION_BLOOM_BITS, hashes: int = REVOCATION_BLOOM_HASHES):
+        self.size_bits = size_bits
+        self.hashes = hashes
+        self.bits = bytearray((size_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        # Doble hashing (Kirsch-Mitzenmacher) a partir de un único blake2b de 128 bits
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class RevocationRegistry:
+    # Un filtro Bloom por franja de expiración: una entrada solo se consulta en la franja
+    # del `exp` de su token y la franja completa se descarta cuando todos sus tokens han expirado
+    def __init__(self, bucket_seconds: int = REVOCATION_BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self._buckets = {}
+        # Almacén exacto solo cuando no hay Redis para confirmar los positivos del filtro
+        self._local = {}
+        self._subscriber_task = None
+
+    def _bucket(self, exp: int) -> int:
+        return int(exp) // self.bucket_seconds
+
+    def _prune(self, now: float):
+        current = int(now) // self.bucket_seconds
+        for bucket in [b for b in self._buckets if b < current]:
+            del self._buckets[bucket]
+        for jti in [j for j, exp in self._local.items() if exp <= now]:
+            del self._local[jti]
+
+    def add(self, jti: str, exp: int):
+        now = time.time()
+        if exp <= now:
+            return
+        self._prune(now)
+        bucket = self._bucket(exp)
+        if bucket not in self._buckets:
+            self._buckets[bucket] = BloomFilter()
+        self._buckets[bucket].add(jti)
+        if redis_client is None:
+            self._local[jti] = exp
+
+    def might_be_revoked(self, jti: str, exp: int) -> bool:
+        bloom = self._buckets.get(self._bucket(exp))
+        return bloom is not None and jti in bloom
+
+    async def is_revoked(self, jti: str, exp: int) -> bool:
+        if not self.might_be_revoked(jti, exp):
+            metrics.inc("revocation_checks_total", {"result": "bloom_miss"})
+            return False
+        # Positivo del filtro: confirmar (Redis o almacén local) para descartar falsos positivos
+        if redis_client:
+            revoked = await redis_client.exists(f"{REVOCATION_KEY_PREFIX}{jti}") == 1
+        else:
+            revoked = self._local.get(jti, 0) > time.time()
+        metrics.inc("revocation_checks_total", {"result": "revoked" if revoked else "false_positive"})
+        return revoked
+
+    async def revoke(self, jti: str, exp: int):
+        self.add(jti, exp)
+        ttl = int(exp - time.time())
+        if ttl <= 0:
+            return
+        if redis_client:
+            await redis_client.set(f"{REVOCATION_KEY_PREFIX}{jti}", "revoked", ex=ttl)
+            await redis_client.publish(REVOCATION_CHANNEL, f"{jti}:{int(exp)}")
+        else:
+            self._persist(jti, exp)
+
+    def _persist(self, jti: str, exp: int):
+        if REVOKED_TOKENS_FILE:
+            with open(REVOKED_TOKENS_FILE, "a") as file:
+                file.write(f"{jti} {int(exp)}\n")
+
+    def load_file(self):
+        # Carga las revocaciones vigentes y compacta el fichero descartando las expiradas.
+        # Las líneas del formato anterior (el token completo) se reescriben como `<digest> <exp>`
+        if not REVOKED_TOKENS_FILE or not os.path.exists(REVOKED_TOKENS_FILE):
+            return
+        now = time.time()
+        entries = {}
+        with open(REVOKED_TOKENS_FILE, "r") as file:
+            for line in file:
+                parts = line.split()
+                if len(parts) == 1:
+                    exp = _legacy_token_exp(parts[0])
+                    if exp is not None and exp > now:
+                        entries[token_digest(parts[0])] = exp
+                elif len(parts) == 2 and parts[1].isdigit() and int(parts[1]) > now:
+                    entries[parts[0]] = int(parts[1])
+        for jti, exp in entries.items():
+            self.add(jti, exp)
+        with open(REVOKED_TOKENS_FILE, "w") as file:
+            file.writelines(f"{jti} {exp}\n" for jti, exp in entries.items())
+
+    async def load_redis(self):
+        now = time.time()
+        async for key in redis_client.scan_iter(match=f"{REVOCATION_KEY_PREFIX}*", count=1000):
+            ttl = await redis_client.ttl(key)
+            if ttl > 0:
+                self.add(key[len(REVOCATION_KEY_PREFIX):], now + ttl)
+        async for key in redis_client.scan_iter(match=f"{LEGACY_TOKEN_PREFIX}*", count=1000):
+            # Revocaciones del formato anterior: se copian a revoked:<digest>, que es la clave con la que
+            # is_revoked confirma los positivos. La antigua se deja caducar (la siguen usando los procesos
+            # con la versión anterior durante un despliegue)
+            ttl = await redis_client.ttl(key)
+            if ttl > 0:
+                jti = token_digest(key)
+                await redis_client.set(f"{REVOCATION_KEY_PREFIX}{jti}", "revoked", ex=ttl)
+                self.add(jti, now + ttl)
+
+    async def _subscribe(self, ready: asyncio.Event):
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # Carga completa tras cada confirmación de suscripción (también la primera): lo
+                        # publicado antes ya está en Redis y lo publicado durante el SCAN queda en el canal
+                        await self.load_redis()
+                        ready.set()
+                        continue
+                    if message["type"] != "message":
+                        continue
+                    jti, _, exp = message["data"].rpartition(":")
+                    if jti and exp.isdigit():
+                        self.add(jti, int(exp))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Revocation subscriber error: {e}")
+                # Sin Redis la aplicación arranca igualmente; se reintenta en segundo plano
+                ready.set()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.reset()
+
+    async def start(self):
+        if redis_client is None:
+            self.load_file()
+        elif self._subscriber_task is None:
+            ready = asyncio.Event()
+            self._subscriber_task = asyncio.create_task(self._subscribe(ready))
+            # La aplicación no atiende peticiones hasta tener el filtro cargado
+            await ready.wait()
+
+    async def stop(self):
+        if self._subscriber_task is not None:
+            self._subscriber_task.cancel()
+            try:
+                await self._subscriber_task
+            except asyncio.CancelledError:
+                pass
+            self._subscriber_task = None
+
+revocations = RevocationRegistry()
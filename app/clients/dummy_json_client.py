@@ -1,102 +1,156 @@
-import json
-import requests
-from app.db.redis_client import redis_client
-import urllib3
+import asyncio
+import os
+from dotenv import load_dotenv
+from app.clients.http_client import get_json
+from app.clients.product_catalog import catalog
+from app.utils.two_tier_cache import TwoTierCache
 
-# Desactiva advertencias por verificación SSL (¡solo para desarrollo!)
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+load_dotenv()
 
-# Tiempo de vida en caché (en segundos)
-CACHE_TTL = 600  # 10 minutos
+# Tiempo de vida en caché (en segundos): fresco durante CACHE_TTL (± jitter) y servido
+# obsoleto durante CACHE_STALE_TTL más mientras se refresca en segundo plano
+CACHE_TTL = int(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "600"))  # 10 minutos
+CACHE_STALE_TTL = int(os.getenv("PRODUCT_CACHE_STALE_SECONDS", "300"))
+CACHE_TTL_JITTER = float(os.getenv("PRODUCT_CACHE_TTL_JITTER", "0.1"))
+CACHE_LOCAL_SIZE = int(os.getenv("PRODUCT_CACHE_LOCAL_SIZE", "4096"))
+
+# Primer nivel en memoria del proceso, segundo nivel en Redis (si está disponible)
+product_cache = TwoTierCache("dummyjson:", CACHE_TTL, CACHE_STALE_TTL, CACHE_TTL_JITTER, CACHE_LOCAL_SIZE)
+
+def _product_fields(product: dict) -> dict:
+    return {
+        "id": product["id"],
+        "title": product["title"],
+        "price": product["price"],
+        "stock": product["stock"]
+    }
+
+async def _fetch_product(product_id: int):
+    status_code, product = await get_json(f"/products/{product_id}")
+    if status_code != 200:
+        print(f"DummyJSON API response error: {status_code}")
+        return None
+    return _product_fields(product)
+
+async def _fetch_products(skip: int, limit: int):
+    status_code, data = await get_json("/products", {"skip": skip, "limit": limit})
+    if status_code != 200:
+        print(f"DummyJSON API response error: {status_code}")
+        return None
+    return [_product_fields(p) for p in data.get("products", [])]
+
+async def _fetch_product_by_name(product_name: str):
+    status_code, data = await get_json("/products/search", {"q": product_name, "limit": 0})
+    if status_code != 200:
+        print(f"DummyJSON API response error: {status_code}")
+        return None
+    filtered_products = [p for p in data.get("products", []) if p["title"] == product_name]
+    return _product_fields(filtered_products[0]) if filtered_products else None
 
 async def get_products(skip: int = 0, limit: int = 0, product_id: int = None):
+    # Primer nivel: catálogo en memoria del proceso
+    if catalog.loaded:
+        if product_id is not None:
+            return catalog.get_by_id(product_id)
+        return catalog.list(skip, limit)
+
     try:
         if product_id is not None:
-            cache_key = f"product_{product_id}"
-            url = f"https://dummyjson.com/products/{product_id}"
-        else:
-            cache_key = f"products_skip_{skip}_limit{limit}"
-            url = f"https://dummyjson.com/products?skip={skip}&limit={limit}"
-        
-        # Verificar si el producto ya está en caché
-        if redis_client:
-            cached_product = await redis_client.get(cache_key)
-            if cached_product:
-                return json.loads(cached_product)
-        
-        response = requests.get(url, verify=False)
-        if response.status_code == 200:
-            if product_id is not None:
-                product = response.json()
-                returned_data = {
-                    "id": product["id"],
-                    "title": product["title"],
-                    "price": product["price"],
-                    "stock": product["stock"]
-                }
-            else:
-                products = response.json().get("products", [])
-                returned_data = [
-                    {
-                        "id": p["id"],
-                        "title": p["title"],
-                        "price": p["price"],
-                        "stock": p["stock"]
-                    }
-                    for p in products
-                ]
-
-            # Guardar en Redis con TTL
-            if redis_client:
-                await redis_client.setex(cache_key, CACHE_TTL, json.dumps(returned_data))
-
-            return returned_data
-        else:
-            print(f"DummyJSON API response error: {response.status_code}")
+            return await product_cache.get_or_load(f"id:{product_id}", lambda: _fetch_product(product_id))
+        return await product_cache.get_or_load(f"list:{skip}:{limit}", lambda: _fetch_products(skip, limit))
     except Exception as e:
         print(f"DummyJSON API error: {e}")
     
     return None
 
+async def get_products_by_ids(product_ids):
+    # Resuelve varios productos a la vez: aciertos de ambos niveles de caché (un MGET para Redis),
+    # peticiones concurrentes para los fallos y un único pipeline de SETEX
+    ids = list(dict.fromkeys(product_ids))
+    products = {}
+    if not ids:
+        return products
+
+    if catalog.loaded:
+        for product_id in ids:
+            product = catalog.get_by_id(product_id)
+            if product is not None:
+                products[product_id] = product
+        # El catálogo está completo: lo que no aparece no existe en DummyJSON
+        return products
+
+    keys = {f"id:{product_id}": product_id for product_id in ids}
+
+    async def fetch_missing(missing_keys):
+        results = await asyncio.gather(
+            *(_fetch_product(keys[key]) for key in missing_keys),
+            return_exceptions=True
+        )
+        fetched = {}
+        for key, result in zip(missing_keys, results):
+            if isinstance(result, Exception):
+                print(f"DummyJSON API error: {result}")
+            else:
+                fetched[key] = result
+        return fetched
+
+    cached = await product_cache.get_many_or_load(list(keys), fetch_missing)
+    return {keys[key]: product for key, product in cached.items()}
+
+async def get_products_by_names(product_names):
+    # Resuelve varios títulos en una sola pasada por el catálogo; sin catálogo, búsquedas concurrentes con caché
+    names = list(dict.fromkeys(product_names))
+    products = {}
+    if not names:
+        return products
+
+    if await catalog.ensure_loaded():
+        for name in names:
+            product = catalog.get_by_title(name)
+            if product is not None:
+                products[name] = product
+        return products
+
+    results = await asyncio.gather(
+        *(product_cache.get_or_load(f"name:{name}", lambda name=name: _fetch_product_by_name(name)) for name in names),
+        return_exceptions=True
+    )
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            print(f"DummyJSON API error: {result}")
+        elif result is not None:
+            products[name] = result
+    return products
+
 async def get_product_by_id(product_id: int):
     try:
-        cache_key = f"product_{product_id}"
-    
-        # Verificar si el producto ya está en caché
-        if redis_client:
-            cached_product = await redis_client.get(cache_key)
-            if cached_product:
-                return json.loads(cached_product)
-        
-        products = await get_products()
-        filtered_products = list(filter(lambda p: p["id"] == product_id, products))
-
-        if filtered_products:
-            if redis_client:
-                await redis_client.setex(cache_key, CACHE_TTL, json.dumps(filtered_products[0]))
-            return filtered_products[0]
-        print(f"No product found with id: {product_id}")
+        if await catalog.ensure_loaded():
+            product = catalog.get_by_id(product_id)
+        else:
+            # Sin catálogo: caché de dos niveles por clave
+            product = await product_cache.get_or_load(f"id:{product_id}", lambda: _fetch_product(product_id))
+        if product is None:
+            print(f"No product found with id: {product_id}")
+        return product
     except Exception as e:
         print(f"DummyJSON API error: {e}")
     return None
 
 async def get_product_by_name(product_name: str):
     try:
-        cache_key = f"product_{product_name}"
-    
-        # Verificar si el producto ya está en caché
-        if redis_client:
-            cached_product = await redis_client.get(cache_key)
-            if cached_product:
-                return json.loads(cached_product)
-        
-        products = await get_products()
-        filtered_products = list(filter(lambda p: p["title"] == product_name, products))
-        if filtered_products:
-            if redis_client:
-                await redis_client.setex(cache_key, CACHE_TTL, json.dumps(filtered_products[0]))
-            return filtered_products[0]
-        print(f"No product found with name: {product_name}")
+        if await catalog.ensure_loaded():
+            product = catalog.get_by_title(product_name)
+        else:
+            # Sin catálogo: caché de dos niveles por clave
+            product = await product_cache.get_or_load(f"name:{product_name}", lambda: _fetch_product_by_name(product_name))
+        if product is None:
+            print(f"No product found with name: {product_name}")
+        return product
     except Exception as e:
         print(f"DummyJSON API error: {e}")
     return None
+
+async def search_products(query: str, limit: int = 10):
+    if not await catalog.ensure_loaded():
+        return None
+    return catalog.search(query, limit)
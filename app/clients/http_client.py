@@ -0,0 +1,63 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+import httpx
+
+from app.utils.metrics import metrics
+from app.utils.query_inspector import record
+
+load_dotenv()
+
+# Configuración del cliente HTTP compartido
+DUMMYJSON_BASE_URL = os.getenv("DUMMYJSON_BASE_URL", "https://dummyjson.com")
+HTTP_VERIFY_SSL = os.getenv("HTTP_VERIFY_SSL", "true").lower() == "true"
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_CONCURRENCY = int(os.getenv("HTTP_MAX_CONCURRENCY", "50"))
+
+http_client: httpx.AsyncClient = None
+_semaphore: asyncio.Semaphore = None
+
+async def init_http_client(transport: httpx.AsyncBaseTransport = None):
+    # Crea el cliente compartido; `transport` permite usar un servidor de pruebas local
+    global http_client, _semaphore
+    if http_client is not None:
+        return http_client
+    http_client = httpx.AsyncClient(
+        base_url=DUMMYJSON_BASE_URL,
+        verify=HTTP_VERIFY_SSL,
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        transport=transport
+    )
+    _semaphore = asyncio.Semaphore(HTTP_MAX_CONCURRENCY)
+    return http_client
+
+async def close_http_client():
+    global http_client, _semaphore
+    if http_client is not None:
+        await http_client.aclose()
+    http_client = None
+    _semaphore = None
+
+async def get_json(path: str, params: dict = None):
+    # Petición GET limitada por el semáforo de concurrencia; devuelve (status_code, json)
+    client = http_client or await init_http_client()
+    async with _semaphore:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+        except httpx.HTTPError as e:
+            metrics.inc("upstream_errors_total", {"upstream": "dummyjson", "reason": type(e).__name__})
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe("upstream_request_duration_seconds", elapsed, {"upstream": "dummyjson"})
+            record("http", f"GET {path}", elapsed)
+    if response.status_code != 200:
+        metrics.inc("upstream_errors_total", {"upstream": "dummyjson", "reason": f"http_{response.status_code}"})
+        return response.status_code, None
+    return response.status_code, response.json()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+from app.clients.http_client import get_json
+
+load_dotenv()
+
+CATALOG_REFRESH_SECONDS = int(os.getenv("CATALOG_REFRESH_SECONDS", "300"))
+CATALOG_PREFIX_MAX_LENGTH = int(os.getenv("CATALOG_PREFIX_MAX_LENGTH", "10"))
+# Tras una descarga fallida, las peticiones no vuelven a intentarla hasta pasado este tiempo
+CATALOG_RETRY_SECONDS = float(os.getenv("CATALOG_RETRY_SECONDS", "30"))
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.casefold().split())
+
+class ProductCatalog:
+    # Catálogo completo de DummyJSON en memoria con índices por id, título normalizado y prefijos
+    def __init__(
+        self,
+        refresh_interval: int = CATALOG_REFRESH_SECONDS,
+        prefix_max_length: int = CATALOG_PREFIX_MAX_LENGTH,
+        retry_seconds: float = CATALOG_RETRY_SECONDS
+    ):
+        self.refresh_interval = refresh_interval
+        self.prefix_max_length = prefix_max_length
+        self.retry_seconds = retry_seconds
+        self.loaded_at = None
+        self.failed_at = None
+        self._products = []
+        self._by_id = {}
+        self._by_title = {}
+        self._by_prefix = {}
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def load(self, products: list):
+        # Construye los índices nuevos y los sustituye de una vez para que las lecturas nunca vean un estado parcial
+        by_id, by_title, by_prefix = {}, {}, {}
+        for product in products:
+            by_id[product["id"]] = product
+            title = normalize_title(product["title"])
+            by_title.setdefault(title, product)
+            for word in set(title.split()):
+                for length in range(1, min(len(word), self.prefix_max_length) + 1):
+                    by_prefix.setdefault(word[:length], set()).add(product["id"])
+        by_prefix = {prefix: sorted(ids) for prefix, ids in by_prefix.items()}
+        self._products, self._by_id, self._by_title, self._by_prefix = list(products), by_id, by_title, by_prefix
+        self.loaded_at = time.time()
+
+    async def _download(self) -> bool:
+        try:
+            status_code, data = await get_json("/products", {"limit": 0, "select": "id,title,price,stock"})
+            if status_code != 200:
+                print(f"DummyJSON API response error: {status_code}")
+                return False
+            self.load([
+                {"id": p["id"], "title": p["title"], "price": p["price"], "stock": p["stock"]}
+                for p in data.get("products", [])
+            ])
+            return True
+        except Exception as e:
+            print(f"Product catalog refresh error: {e}")
+            return False
+
+    async def refresh(self) -> bool:
+        # Descarga incondicional (arranque y refresco periódico)
+        async with self._refresh_lock:
+            refreshed = await self._download()
+            self.failed_at = None if refreshed else time.monotonic()
+            return refreshed
+
+    def _cooling_down(self) -> bool:
+        return self.failed_at is not None and time.monotonic() - self.failed_at < self.retry_seconds
+
+    async def ensure_loaded(self) -> bool:
+        # Con el catálogo vacío, una sola descarga para todas las peticiones que esperan el lock y,
+        # si falla, ninguna más hasta pasados retry_seconds (mientras tanto se usa DummyJSON directamente)
+        if self.loaded or self._cooling_down():
+            return self.loaded
+        async with self._refresh_lock:
+            if not self.loaded and not self._cooling_down():
+                self.failed_at = None if await self._download() else time.monotonic()
+        return self.loaded
+
+    def get_by_id(self, product_id: int):
+        return self._by_id.get(product_id)
+
+    def get_by_title(self, title: str):
+        return self._by_title.get(normalize_title(title))
+
+    def list(self, skip: int = 0, limit: int = 0):
+        # Misma semántica que DummyJSON: limit=0 devuelve todos los productos
+        return self._products[skip:skip + limit] if limit else self._products[skip:]
+
+    def search(self, query: str, limit: int = 10):
+        words = normalize_title(query).split()
+        if not words:
+            return []
+        by_id = self._by_id
+        candidates = self._by_prefix.get(words[0][:self.prefix_max_length], [])
+        results = []
+        for product_id in candidates:
+            product = by_id[product_id]
+            title_words = normalize_title(product["title"]).split()
+            if all(any(t.startswith(w) for t in title_words) for w in words):
+                results.append(product)
+                if len(results) >= limit:
+                    break
+        return results
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self):
+        await self.refresh()
+        if self._refresh_task is None and self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+catalog = ProductCatalog()
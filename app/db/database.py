@@ -1,6 +1,17 @@
 from dotenv import load_dotenv
 import os
+import time
+from contextlib import asynccontextmanager
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.metrics import metrics
+from app.utils.query_inspector import record
 
 load_dotenv()
 
@@ -17,17 +28,197 @@ DB_NAME = os.getenv("DB_NAME")
 if not IN_DOCKER:
     DB_HOST = "localhost"
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# DATABASE_URL permite sobrescribir la conexión completa (p. ej. sqlite:///./local.db)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Modo asíncrono: las sesiones usan un driver async (asyncpg / aiosqlite)
+DB_ASYNC = os.getenv("DB_ASYNC", "true").lower() == "true"
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Perfil del engine (pool de conexiones, timeouts y logging de SQL)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+class _WaitTrackingPoolMixin:
+    # Cuenta las veces que un checkout tuvo que esperar a que se liberase una conexión
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        if self.checkedin() > 0 or self._max_overflow < 0 or self.overflow() < self._max_overflow:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.waits += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+
+class InstrumentedQueuePool(_WaitTrackingPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_WaitTrackingPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def engine_options(url: str, is_async: bool) -> dict:
+    options = {"echo": DB_ECHO}
+    if url.startswith("sqlite"):
+        # SQLite: la sesión síncrona se usa desde varios hilos del threadpool
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_recycle=DB_POOL_RECYCLE
+    )
+    if DB_STATEMENT_TIMEOUT_MS > 0 and url.startswith("postgresql"):
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
 
 # Usa DATABASE_URL para crear la conexión
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, False))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, True)) if DB_ASYNC else None
+
+def _statement_operation(statement: str) -> str:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return operation if operation in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    labels = {"operation": _statement_operation(statement)}
+    metrics.inc("db_statements_total", labels)
+    metrics.observe("db_statement_duration_seconds", elapsed, labels)
+    record("sql", statement, elapsed)
+
+def instrument_engine(sync_engine):
+    # Número y duración de las sentencias SQL por tipo (SELECT/INSERT/UPDATE/DELETE/WITH/OTHER)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+
+def _pool_stats(pool) -> dict:
+    if not isinstance(pool, _WaitTrackingPoolMixin):
+        return {"pool": pool.status()}
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "waits": pool.waits,
+        "wait_time_total": round(pool.wait_time_total, 6),
+        "wait_time_max": round(pool.wait_time_max, 6),
+        "timeouts": pool.timeouts
+    }
+
+def get_pool_stats() -> dict:
+    stats = {"sync": _pool_stats(engine.pool)}
+    if async_engine is not None:
+        stats["async"] = _pool_stats(async_engine.sync_engine.pool)
+    return stats
+
+class SyncSessionAdapter:
+    # Expone una Session síncrona con la misma interfaz awaitable que AsyncSession,
+    # ejecutando cada operación en el threadpool para no bloquear el event loop
+    def __init__(self, session: Session):
+        self.session = session
+
+    def add(self, instance):
+        self.session.add(instance)
+
+    def add_all(self, instances):
+        self.session.add_all(instances)
+
+    async def exec(self, statement, **kwargs):
+        return await run_in_threadpool(self.session.exec, statement, **kwargs)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.session.scalar, statement, *args, **kwargs)
+
+    async def get(self, entity, ident):
+        return await run_in_threadpool(self.session.get, entity, ident)
+
+    async def flush(self):
+        await run_in_threadpool(self.session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.session.rollback)
+
+    async def refresh(self, instance):
+        await run_in_threadpool(self.session.refresh, instance)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.session.delete, instance)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
 def drop_db_and_tables():
     SQLModel.metadata.drop_all(engine)
+    # Sin tablas el esquema vuelve a la versión 0 (ver app/db/migrate.py)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+
+@asynccontextmanager
+async def session_scope():
+    # Sesión independiente de la petición (p. ej. para respuestas en streaming o tareas en segundo plano)
+    if DB_ASYNC:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        with Session(engine, expire_on_commit=False) as session:
+            yield SyncSessionAdapter(session)
+
+async def get_db_session():
+    async with session_scope() as session:
+        yield session
 
-def get_db_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+async def dispose_engines():
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,174 @@
+import argparse
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from logging import getLogger
+from typing import Optional
+import sqlalchemy as sa
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import engine
+from app.db.migrations import m0001_initial, m0002_hot_path_indexes, m0003_sales_summary, m0004_order_product_snapshot
+
+load_dotenv()
+
+logger = getLogger(__name__)
+
+# Aplica las migraciones pendientes al arrancar la aplicación (desactivado por defecto)
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "false").lower() == "true"
+
+# Migraciones en orden; cada módulo define VERSION, NAME, upgrade(conn) y downgrade(conn) (solo
+# esquema, en una transacción), y opcionalmente backfill(conn) para rellenar datos que dependen de
+# servicios externos: lo ejecuta `backfill`, fuera de la transacción del cambio de esquema, y abre
+# sus propias transacciones para no mantener ninguna durante las llamadas externas. Con
+# TRANSACTIONAL = False la migración se ejecuta en autocommit (p. ej. CREATE INDEX CONCURRENTLY) y
+# tiene que ser idempotente: si falla a medias se vuelve a ejecutar entera
+MIGRATIONS = [
+    m0001_initial,
+    m0002_hot_path_indexes,
+    m0003_sales_summary,
+    m0004_order_product_snapshot,
+]
+
+# Clave del advisory lock de Postgres: varios workers arrancando a la vez no aplican la misma migración
+MIGRATION_LOCK_ID = 7305146
+
+metadata = sa.MetaData()
+
+schema_migrations = sa.Table(
+    "schema_migrations",
+    metadata,
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String, nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+@contextmanager
+def _migration_connection():
+    with engine.connect() as conn:
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            conn.execute(sa.text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        schema_migrations.create(conn, checkfirst=True)
+        conn.commit()
+        try:
+            yield conn
+        finally:
+            if postgres:
+                conn.rollback()
+                conn.execute(sa.text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                conn.commit()
+
+def _applied_versions(conn) -> list:
+    versions = [row[0] for row in conn.execute(sa.select(schema_migrations.c.version).order_by(schema_migrations.c.version))]
+    conn.commit()
+    return versions
+
+def _run(conn, migration, step):
+    # Cambio de esquema en su propia transacción o, con TRANSACTIONAL = False, en autocommit
+    if getattr(migration, "TRANSACTIONAL", True):
+        with conn.begin():
+            step(conn)
+        return
+    conn.execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        step(conn)
+    finally:
+        # Cierra la transacción lógica de SQLAlchemy (en autocommit no hay nada que confirmar)
+        conn.rollback()
+        conn.execution_options(isolation_level=conn.default_isolation_level)
+
+def upgrade(target: Optional[int] = None) -> list:
+    # Aplica en orden las migraciones pendientes hasta `target` (todas por defecto), una transacción por migración
+    applied_now = []
+    with _migration_connection() as conn:
+        applied = set(_applied_versions(conn))
+        for migration in MIGRATIONS:
+            if migration.VERSION in applied or (target is not None and migration.VERSION > target):
+                continue
+            _run(conn, migration, migration.upgrade)
+            with conn.begin():
+                conn.execute(schema_migrations.insert().values(version=migration.VERSION, name=migration.NAME, applied_at=datetime.utcnow()))
+            logger.info(f"Applied migration {migration.VERSION:04d}_{migration.NAME}")
+            applied_now.append(migration.VERSION)
+    return applied_now
+
+def downgrade(target: Optional[int] = None) -> list:
+    # Revierte las migraciones posteriores a `target` (por defecto solo la última aplicada)
+    reverted = []
+    with _migration_connection() as conn:
+        applied = _applied_versions(conn)
+        if not applied:
+            return reverted
+        if target is None:
+            target = applied[-2] if len(applied) > 1 else 0
+        for migration in reversed(MIGRATIONS):
+            if migration.VERSION not in applied or migration.VERSION <= target:
+                continue
+            _run(conn, migration, migration.downgrade)
+            with conn.begin():
+                conn.execute(schema_migrations.delete().where(schema_migrations.c.version == migration.VERSION))
+            logger.info(f"Reverted migration {migration.VERSION:04d}_{migration.NAME}")
+            reverted.append(migration.VERSION)
+    return reverted
+
+def backfill() -> dict:
+    # Repite el relleno de datos de las migraciones ya aplicadas (p. ej. si DummyJSON no respondía al migrar)
+    results = {}
+    with _migration_connection() as conn:
+        applied = set(_applied_versions(conn))
+        for migration in MIGRATIONS:
+            if migration.VERSION in applied and hasattr(migration, "backfill"):
+                results[migration.VERSION] = migration.backfill(conn)
+    return results
+
+def status() -> list:
+    with _migration_connection() as conn:
+        applied = set(_applied_versions(conn))
+    return [(migration.VERSION, migration.NAME, migration.VERSION in applied) for migration in MIGRATIONS]
+
+async def migrate_on_startup():
+    if DB_MIGRATE_ON_STARTUP:
+        await run_in_threadpool(upgrade)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.db.migrate", description="Database schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="Target version (default: latest)")
+    downgrade_parser = commands.add_parser("downgrade", help="Revert applied migrations")
+    downgrade_parser.add_argument("--to", type=int, default=None, help="Target version (default: previous)")
+    commands.add_parser("status", help="Show applied and pending migrations")
+    commands.add_parser("backfill", help="Re-run the data backfill of applied migrations")
+    commands.add_parser("check", help="EXPLAIN the hot-path queries and fail on full table or index scans")
+    args = parser.parse_args(argv)
+
+    if args.command == "upgrade":
+        versions = upgrade(args.to)
+        print(f"Applied: {versions}" if versions else "Database is up to date")
+        # Relleno de datos después del commit del esquema (migrate_on_startup no lo hace: no retrasa el arranque)
+        for version, rows in backfill().items():
+            print(f"{version:04d}: {rows} rows backfilled")
+    elif args.command == "downgrade":
+        versions = downgrade(args.to)
+        print(f"Reverted: {versions}" if versions else "Nothing to revert")
+    elif args.command == "backfill":
+        for version, rows in backfill().items():
+            print(f"{version:04d}: {rows} rows updated")
+    elif args.command == "status":
+        for version, name, applied in status():
+            print(f"{version:04d}_{name}: {'applied' if applied else 'pending'}")
+    else:
+        # Importación diferida: el plan de consultas depende de los servicios (y estos de los clientes HTTP)
+        from app.db.query_plans import check_query_plans
+        failures = check_query_plans()
+        for name, plan in failures.items():
+            print(f"Full scan in {name}:\n{plan}\n")
+        print(f"{len(failures)} queries scan a whole table or index" if failures else "All hot-path queries use index lookups or ranges")
+        return 1 if failures else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import sqlalchemy as sa
+
+# Esquema inicial tal y como lo creaba SQLModel.metadata.create_all.
+# Se define aquí (y no a partir de los modelos) para que la migración no cambie cuando cambien los modelos
+VERSION = 1
+NAME = "initial"
+
+metadata = sa.MetaData()
+
+user = sa.Table(
+    "user",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("username", sa.String, nullable=False),
+    sa.Column("email", sa.String, nullable=False),
+    sa.Column("role", sa.String, nullable=True),
+    sa.Column("hashed_password", sa.String, nullable=False),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+    sa.Column("refresh_token", sa.String, nullable=True),
+    sa.Index("ix_user_username", "username", unique=True),
+    sa.Index("ix_user_email", "email", unique=True),
+)
+
+order = sa.Table(
+    "order",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("quantity", sa.Integer, nullable=False),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("product_id", sa.Integer, nullable=False),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+)
+
+def upgrade(conn):
+    # checkfirst: las bases de datos creadas antes de las migraciones ya tienen estas tablas
+    metadata.create_all(conn, checkfirst=True)
+
+def downgrade(conn):
+    metadata.drop_all(conn, checkfirst=True)
@@ -0,0 +1,62 @@
+import sqlalchemy as sa
+
+# Índices compuestos con la forma de las consultas calientes:
+# - order(user_id, created_at, id): listado/exportación de pedidos de un cliente (join + filtro por usuario + keyset)
+# - order(created_at, id): listado de pedidos del admin con paginación keyset
+# - order(product_id): búsquedas y agregados por producto
+# - user(refresh_token): /api/auth/refresh
+# - user(created_at, id): listado de usuarios con paginación keyset
+# En Postgres se crean y se borran con CONCURRENTLY para no bloquear las escrituras en order y user
+# mientras se construyen (con decenas de millones de filas tardan minutos). CONCURRENTLY no puede ir
+# dentro de una transacción: migrate ejecuta esta migración en autocommit, y es idempotente
+VERSION = 2
+NAME = "hot_path_indexes"
+TRANSACTIONAL = False
+
+# Tablas propias de la migración (solo las columnas indexadas) para no añadir los índices al metadata de 0001
+metadata = sa.MetaData()
+
+order = sa.Table(
+    "order",
+    metadata,
+    sa.Column("id", sa.Integer),
+    sa.Column("user_id", sa.Integer),
+    sa.Column("product_id", sa.Integer),
+    sa.Column("created_at", sa.DateTime),
+)
+
+user = sa.Table(
+    "user",
+    metadata,
+    sa.Column("id", sa.Integer),
+    sa.Column("created_at", sa.DateTime),
+    sa.Column("refresh_token", sa.String),
+)
+
+INDEXES = [
+    sa.Index("ix_order_user_id_created_at_id", order.c.user_id, order.c.created_at, order.c.id, postgresql_concurrently=True),
+    sa.Index("ix_order_created_at_id", order.c.created_at, order.c.id, postgresql_concurrently=True),
+    sa.Index("ix_order_product_id", order.c.product_id, postgresql_concurrently=True),
+    sa.Index("ix_user_refresh_token", user.c.refresh_token, postgresql_concurrently=True),
+    sa.Index("ix_user_created_at_id", user.c.created_at, user.c.id, postgresql_concurrently=True),
+]
+
+def _drop_invalid(conn, index: sa.Index):
+    # Un CREATE INDEX CONCURRENTLY interrumpido deja el índice marcado como no válido: checkfirst lo daría
+    # por creado, así que se borra para construirlo de nuevo
+    invalid = conn.execute(sa.text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    ), {"name": index.name}).first()
+    if invalid:
+        index.drop(conn)
+
+def upgrade(conn):
+    for index in INDEXES:
+        if conn.dialect.name == "postgresql":
+            _drop_invalid(conn, index)
+        index.create(conn, checkfirst=True)
+
+def downgrade(conn):
+    for index in reversed(INDEXES):
+        index.drop(conn, checkfirst=True)
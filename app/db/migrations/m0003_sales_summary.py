@@ -0,0 +1,26 @@
+import sqlalchemy as sa
+
+# Tabla de agregados de ventas por producto, cliente y día (ver app/services/sales_stats.py).
+# Se crea vacía: para calcularla a partir de los pedidos existentes se usa
+# `python -m app.services.sales_stats rebuild`, que necesita los precios de DummyJSON
+VERSION = 3
+NAME = "sales_summary"
+
+metadata = sa.MetaData()
+
+sales_summary = sa.Table(
+    "sales_summary",
+    metadata,
+    sa.Column("dimension", sa.String, primary_key=True),
+    sa.Column("bucket", sa.String, primary_key=True),
+    sa.Column("units", sa.Integer, nullable=False),
+    sa.Column("revenue", sa.Float, nullable=False),
+    sa.Column("orders", sa.Integer, nullable=False),
+    sa.Index("ix_sales_summary_dimension_revenue", "dimension", "revenue"),
+)
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+
+def downgrade(conn):
+    metadata.drop_all(conn, checkfirst=True)
@@ -0,0 +1,91 @@
+from logging import getLogger
+import httpx
+import sqlalchemy as sa
+
+from app.clients.http_client import DUMMYJSON_BASE_URL, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_VERIFY_SSL
+
+# Copia del título y el precio unitario del producto en cada pedido (se rellenan al crearlo).
+# upgrade solo cambia el esquema: la llamada a DummyJSON no puede hacerse dentro de la transacción
+# del ALTER TABLE (en Postgres bloquearía todas las lecturas y escrituras de pedidos mientras espera).
+# El backfill de los pedidos existentes lo ejecuta `python -m app.db.migrate backfill` (también
+# `upgrade` desde la línea de comandos, después del commit); mientras tanto, los pedidos sin copia
+# se siguen enriqueciendo desde DummyJSON al leerlos
+VERSION = 4
+NAME = "order_product_snapshot"
+
+logger = getLogger(__name__)
+
+metadata = sa.MetaData()
+
+order = sa.Table(
+    "order",
+    metadata,
+    sa.Column("id", sa.Integer),
+    sa.Column("product_id", sa.Integer),
+    sa.Column("product_title", sa.String),
+    sa.Column("unit_price", sa.Float),
+)
+
+COLUMNS = [order.c.product_title, order.c.unit_price]
+
+def _existing_columns(conn) -> set:
+    return {column["name"] for column in sa.inspect(conn).get_columns("order")}
+
+def upgrade(conn):
+    table = conn.dialect.identifier_preparer.quote("order")
+    existing = _existing_columns(conn)
+    for column in COLUMNS:
+        if column.name not in existing:
+            conn.execute(sa.text(f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"))
+
+def downgrade(conn):
+    # DROP COLUMN: Postgres y SQLite >= 3.35
+    table = conn.dialect.identifier_preparer.quote("order")
+    existing = _existing_columns(conn)
+    for column in reversed(COLUMNS):
+        if column.name in existing:
+            conn.execute(sa.text(f"ALTER TABLE {table} DROP COLUMN {column.name}"))
+
+def _fetch_catalog() -> dict:
+    # Misma configuración (verificación TLS y timeouts) que el cliente HTTP de la aplicación
+    response = httpx.get(
+        f"{DUMMYJSON_BASE_URL}/products",
+        params={"limit": 0, "select": "title,price"},
+        verify=HTTP_VERIFY_SSL,
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    )
+    response.raise_for_status()
+    return {product["id"]: product for product in response.json()["products"]}
+
+def backfill(conn) -> int:
+    # Abre sus propias transacciones: el catálogo se descarga sin ninguna abierta.
+    # Un UPDATE por producto (executemany) para los pedidos que aún no tienen la copia
+    with conn.begin():
+        product_ids = [row[0] for row in conn.execute(sa.select(order.c.product_id).where(order.c.product_title.is_(None)).distinct())]
+    if not product_ids:
+        return 0
+    try:
+        products = _fetch_catalog()
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        logger.warning(f"Order snapshot backfill skipped, DummyJSON unavailable: {e}")
+        return 0
+
+    params = [
+        {"pid": product_id, "title": products[product_id]["title"], "price": float(products[product_id]["price"])}
+        for product_id in product_ids
+        if product_id in products
+    ]
+    if not params:
+        return 0
+    statement = (
+        order.update()
+        .where(order.c.product_id == sa.bindparam("pid"), order.c.product_title.is_(None))
+        .values(product_title=sa.bindparam("title"), unit_price=sa.bindparam("price"))
+    )
+    # rowcount no es fiable con executemany en todos los drivers: se cuentan los pedidos sin copia
+    # antes y después del UPDATE, en la misma transacción
+    pending = sa.select(sa.func.count()).select_from(order).where(order.c.product_title.is_(None))
+    with conn.begin():
+        before = conn.execute(pending).scalar()
+        conn.execute(statement, params)
+        return before - conn.execute(pending).scalar()
@@ -0,0 +1,84 @@
+from datetime import date, datetime
+from sqlmodel import select
+
+from app.db.database import engine
+from app.models.order import Order
+from app.models.user import User
+from app.services.order import order_list_query
+from app.services.sales_stats import sales_days_query, sales_top_query
+from app.services.user import user_list_query
+from app.utils.pagination import encode_cursor, paginate
+
+# Consultas con la misma forma que las de los servicios y rutas (mismos constructores),
+# para que un cambio en una consulta se refleje en la comprobación de su plan
+ADMIN = {"sub": "user_admin", "role": "admin"}
+CUSTOMER = {"sub": "user_customer", "role": "customer"}
+
+def hot_path_queries() -> dict:
+    cursor = encode_cursor(datetime(2024, 1, 1), 1)
+    return {
+        "orders.list.customer": paginate(order_list_query(CUSTOMER), Order.created_at, Order.id, 0, 10),
+        "orders.list.admin.cursor": paginate(order_list_query(ADMIN), Order.created_at, Order.id, 0, 10, cursor),
+        "orders.by_id": order_list_query(ADMIN, id=1),
+        "orders.by_user_id": paginate(order_list_query(ADMIN, user_id=1), Order.created_at, Order.id, 0, 1),
+        "orders.export.batch": paginate(order_list_query(ADMIN, username="user_customer"), Order.created_at, Order.id, 0, 1000, cursor),
+        "users.list.cursor": paginate(user_list_query(ADMIN), User.created_at, User.id, 0, 10, cursor),
+        "users.by_username": select(User).where(User.username == "user_customer"),
+        "auth.refresh_token": select(User).where(User.refresh_token == "token"),
+        "orders.stats.products": sales_top_query("product", 10),
+        "orders.stats.customers": sales_top_query("customer", 10),
+        "orders.stats.periods": sales_days_query(date(2024, 1, 1), date(2024, 3, 31)),
+    }
+
+def _explain(conn, statement) -> list:
+    compiled = statement.compile(dialect=conn.dialect)
+    params = compiled.params
+    if conn.dialect.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled.string}", params).fetchall()
+        return [row[3] for row in rows]
+    rows = conn.exec_driver_sql(f"EXPLAIN {compiled.string}", params).fetchall()
+    return [row[0] for row in rows]
+
+def _node_details(plan: list, index: int) -> list:
+    # Líneas de detalle (Index Cond, Filter...) de un nodo de Postgres: las siguientes hasta el próximo nodo "->"
+    details = []
+    for line in plan[index + 1:]:
+        if line.strip().startswith("->"):
+            break
+        details.append(line.strip())
+    return details
+
+def full_scans(plan: list) -> list:
+    # Líneas del plan que recorren una tabla o un índice completos:
+    # - Postgres: "Seq Scan" o un "Index [Only] Scan" sin "Index Cond" (recorre todo el índice)
+    # - SQLite: cualquier "SCAN <tabla>", también "SCAN <tabla> USING [COVERING] INDEX" (las
+    #   restricciones de rango solo aparecen en "SEARCH ... (col>?)")
+    scans = []
+    for index, line in enumerate(plan):
+        node = line.strip().lstrip("->").strip()
+        if node.startswith("Seq Scan"):
+            scans.append(node)
+        elif node.startswith(("Index Scan", "Index Only Scan")):
+            if not any(detail.startswith("Index Cond") for detail in _node_details(plan, index)):
+                scans.append(node)
+        elif node.startswith("SCAN") and "CONSTANT ROW" not in node:
+            scans.append(node)
+    return scans
+
+def check_query_plans() -> dict:
+    # Devuelve {consulta: plan} de las consultas que recorren una tabla o un índice completos
+    failures = {}
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # Con tablas pequeñas el planificador prefiere un seq scan aunque exista el índice:
+            # se penaliza para comprobar que hay un índice utilizable, no el coste actual
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        for name, statement in hot_path_queries().items():
+            plan = _explain(conn, statement)
+            if full_scans(plan):
+                failures[name] = "\n".join(plan)
+        conn.rollback()
+    return failures
@@ -1,6 +1,11 @@
 import os
+import time
 from dotenv import load_dotenv
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+
+from app.utils.metrics import metrics
+from app.utils.query_inspector import record
 
 load_dotenv()
 
@@ -10,7 +15,43 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
 
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe("redis_command_duration_seconds", elapsed, {"command": "PIPELINE"})
+            record("redis", "PIPELINE", elapsed)
+
+class InstrumentedRedis(redis.Redis):
+    # Mide la latencia de cada comando (etiqueta: nombre del comando) y de cada pipeline completo
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            elapsed = time.perf_counter() - start
+            command = str(args[0]).upper()
+            metrics.observe("redis_command_duration_seconds", elapsed, {"command": command})
+            record("redis", f"{command} {args[1]}" if len(args) > 1 else command, elapsed)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
 redis_client = None
 if IN_DOCKER:
-    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+    redis_client = InstrumentedRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+
+async def init_redis():
+    # Comprueba la conexión al arrancar cada worker; si Redis no responde se sigue sin él en cada llamada
+    if redis_client:
+        try:
+            await redis_client.ping()
+        except Exception as e:
+            print(f"Redis error: {e}")
 
+async def close_redis():
+    if redis_client:
+        await redis_client.close()
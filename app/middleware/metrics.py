@@ -0,0 +1,44 @@
+import time
+from starlette.routing import Match
+
+from app.utils.metrics import metrics
+
+def _route_template(scope) -> str:
+    # Plantilla de la ruta (p. ej. /orders/{customer_name}/csv) para acotar la cardinalidad de las etiquetas
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "<unmatched>"
+
+class MetricsMiddleware:
+    # Middleware ASGI puro: latencia por ruta, método y estado, y peticiones en curso por ruta
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start_time = time.perf_counter()
+        route = _route_template(scope)
+        labels = {"method": scope["method"], "route": route}
+        state = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            await send(message)
+
+        metrics.gauge_add("http_requests_in_progress", labels, 1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.gauge_add("http_requests_in_progress", labels, -1)
+            metrics.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - start_time,
+                {"method": scope["method"], "route": route, "status": str(state["status"])}
+            )
@@ -0,0 +1,40 @@
+from logging import getLogger
+
+from app.utils.query_inspector import end_report, start_report
+
+logger = getLogger("app.queries")
+
+class QueryInspectorMiddleware:
+    # Middleware ASGI puro (solo con QUERY_INSPECTOR_ENABLED): abre un informe por petición y lo
+    # resume en las cabeceras X-Query-Count, X-Query-N-Plus-One y X-Query-Report-Id. El informe
+    # completo queda en GET /internal/queries/{id}
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        report, token = start_report(scope["method"], scope["path"])
+        state = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                # Las cabeceras reflejan lo ejecutado hasta ahora (en streaming el resto llega después)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", report.header().encode("latin-1")))
+                headers.append((b"x-query-n-plus-one", str(len(report.n_plus_one())).encode("latin-1")))
+                headers.append((b"x-query-report-id", report.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_report(report, token, state["status"])
+            for group in report.n_plus_one():
+                logger.warning(
+                    "Possible N+1 in %s %s: %sx %s %s",
+                    scope["method"], scope["path"], group["count"], group["kind"], group["shape"]
+                )
@@ -0,0 +1,75 @@
+import os
+import random
+import time
+from logging import getLogger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = getLogger("app.requests")
+
+# Muestreo y captura de cuerpos acotada
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_ERROR_SAMPLE_RATE = float(os.getenv("LOG_ERROR_SAMPLE_RATE", "1.0"))
+LOG_BODY_SAMPLE_RATE = float(os.getenv("LOG_BODY_SAMPLE_RATE", "0.0"))
+LOG_BODY_MAX_BYTES = int(os.getenv("LOG_BODY_MAX_BYTES", "1024"))
+LOG_BODY_CONTENT_TYPES = tuple(
+    content_type.strip() for content_type in os.getenv("LOG_BODY_CONTENT_TYPES", "application/json").split(",") if content_type.strip()
+)
+
+def _loggable_content_type(content_type: str) -> bool:
+    return content_type.startswith(LOG_BODY_CONTENT_TYPES)
+
+def _header(headers, name: bytes) -> str:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return ""
+
+class RequestLoggingMiddleware:
+    # Middleware ASGI puro: no envuelve ni bufferiza la respuesta, solo observa los mensajes
+    # y copia como mucho LOG_BODY_MAX_BYTES de los cuerpos con content-type permitido
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start_time = time.perf_counter()
+        capture_bodies = LOG_BODY_MAX_BYTES > 0 and random.random() < LOG_BODY_SAMPLE_RATE
+        capture_request = capture_bodies and _loggable_content_type(_header(scope["headers"], b"content-type"))
+        request_body = bytearray()
+        response_body = bytearray()
+        state = {"status": 500, "capture_response": False}
+
+        async def receive_wrapper():
+            message = await receive()
+            if capture_request and message["type"] == "http.request" and len(request_body) < LOG_BODY_MAX_BYTES:
+                request_body.extend(message.get("body", b"")[:LOG_BODY_MAX_BYTES - len(request_body)])
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                state["capture_response"] = capture_bodies and _loggable_content_type(_header(message.get("headers", []), b"content-type"))
+            elif message["type"] == "http.response.body" and state["capture_response"] and len(response_body) < LOG_BODY_MAX_BYTES:
+                response_body.extend(message.get("body", b"")[:LOG_BODY_MAX_BYTES - len(response_body)])
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            status = state["status"]
+            sample_rate = LOG_ERROR_SAMPLE_RATE if status >= 400 else LOG_SAMPLE_RATE
+            if random.random() < sample_rate:
+                process_time = time.perf_counter() - start_time
+                if capture_bodies:
+                    logger.info(
+                        "%s %s - %s - %.4fs - Request: %s - Response: %s",
+                        scope["method"], scope["path"], status, process_time,
+                        request_body.decode("utf-8", errors="replace") or "No Body",
+                        response_body.decode("utf-8", errors="replace") or "<not captured>"
+                    )
+                else:
+                    logger.info("%s %s - %s - %.4fs", scope["method"], scope["path"], status, process_time)
@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import validator
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 class OrderBase(SQLModel):
@@ -13,10 +14,20 @@ class OrderBase(SQLModel):
         return v
 
 class Order(OrderBase, table=True):
+    # Índices de las consultas calientes (ver app/db/migrations/m0002_hot_path_indexes.py)
+    __table_args__ = (
+        Index("ix_order_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_order_created_at_id", "created_at", "id"),
+        Index("ix_order_product_id", "product_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     product_id: int 
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Copia del producto al crear el pedido (NULL en pedidos antiguos sin backfill)
+    product_title: Optional[str] = None
+    unit_price: Optional[float] = None
 
 class OrderCreate(OrderBase):
     customer_username: str
@@ -29,6 +40,15 @@ class OrderRead(OrderBase):
     price: float
     created_at: datetime
 
+class OrderBulkError(SQLModel):
+    index: int
+    status_code: int
+    detail: str
+
+class OrderBulkResult(SQLModel):
+    created: List[OrderRead]
+    errors: List[OrderBulkError]
+
 class OrderUpdate(SQLModel):
     quantity: Optional[int] = None
 
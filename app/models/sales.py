@@ -0,0 +1,30 @@
+from datetime import date
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+class SalesSummary(SQLModel, table=True):
+    # Agregados de ventas mantenidos al crear, modificar o borrar pedidos (ver app/services/sales_stats.py).
+    # dimension: "product" (bucket = product_id), "customer" (bucket = user_id) o "day" (bucket = AAAA-MM-DD)
+    __tablename__ = "sales_summary"
+    __table_args__ = (
+        Index("ix_sales_summary_dimension_revenue", "dimension", "revenue"),
+    )
+
+    dimension: str = Field(primary_key=True)
+    bucket: str = Field(primary_key=True)
+    units: int = 0
+    revenue: float = 0.0
+    orders: int = 0
+
+class SalesStat(SQLModel):
+    key: str
+    label: str
+    units: int
+    revenue: float
+    orders: int
+
+class SalesPeriodStat(SQLModel):
+    period_start: date
+    units: int
+    revenue: float
+    orders: int
@@ -1,5 +1,6 @@
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 from enum import Enum
 from pydantic import EmailStr
@@ -13,6 +14,11 @@ class UserBase(SQLModel):
     role: Optional[str] = Field(default="customer")  # Default role is "customer"
 
 class User(UserBase, table=True):
+    __table_args__ = (
+        Index("ix_user_refresh_token", "refresh_token"),
+        Index("ix_user_created_at_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     hashed_password: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.auth.dependencies import require_role
+from app.auth.token_cache import token_cache
+from app.clients.dummy_json_client import product_cache
+from app.db.database import get_pool_stats
+from app.utils.pdf_engine import pdf_engine
+from app.utils.query_inspector import get_report, recent_reports
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+@router.get("/db/pool")
+async def get_db_pool_stats(current_user: dict = Depends(require_role("admin"))):
+    return get_pool_stats()
+
+@router.get("/auth/token-cache")
+async def get_token_cache_stats(current_user: dict = Depends(require_role("admin"))):
+    return token_cache.stats()
+
+@router.get("/pdf/stats")
+async def get_pdf_engine_stats(current_user: dict = Depends(require_role("admin"))):
+    return pdf_engine.stats()
+
+@router.get("/cache/products")
+async def get_product_cache_stats(current_user: dict = Depends(require_role("admin"))):
+    return product_cache.stats()
+
+@router.get("/queries")
+async def list_query_reports(current_user: dict = Depends(require_role("admin"))):
+    # Informes de las últimas peticiones (solo con QUERY_INSPECTOR_ENABLED)
+    return recent_reports()
+
+@router.get("/queries/{report_id}")
+async def get_query_report(report_id: str, current_user: dict = Depends(require_role("admin"))):
+    report = get_report(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Query report not found")
+    return report.summary()
@@ -0,0 +1,25 @@
+import hmac
+import os
+from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.metrics import render_metrics
+
+load_dotenv()
+
+# Si se define, Prometheus debe enviar `Authorization: Bearer <METRICS_TOKEN>`
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request):
+    if METRICS_TOKEN:
+        authorization = request.headers.get("authorization", "")
+        if not hmac.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    # Con varios workers se leen los ficheros del resto: fuera del event loop
+    body = await run_in_threadpool(render_metrics)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,91 +1,158 @@
 import os
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import FileResponse
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.auth.dependencies import require_role
-from app.services.order import create_order, read_order, update_order, delete_order
+from app.services.order import create_order, create_orders_bulk, iter_order_batches, read_order_page, update_order, delete_order
+from app.services.report_jobs import REPORT_FORMATS, artifact_path, get_report_job, submit_report_job
+from app.services.sales_stats import sales_by_customer, sales_by_period, sales_by_product
 from app.db.database import get_db_session
-from app.models.order import OrderCreate, OrderRead, OrderUpdate
-from app.utils.report_generator import generate_csv, generate_excel, generate_pdf
+from app.models.order import OrderBulkResult, OrderCreate, OrderRead, OrderUpdate
+from app.models.sales import SalesPeriodStat, SalesStat
+from app.utils.report_generator import collect_pdf_orders, generate_csv, generate_excel, generate_pdf, pdf_limit
+from app.utils.response_cache import cached_response
+from app.utils.serialization import ORDER_LIST_ADAPTER
 
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# Top N de las estadísticas: recorre el índice por ingresos, así que el número de filas se acota
+STATS_MAX_LIMIT = 100
+
 @router.get("/", response_model=List[OrderRead])
 async def get_order_endpoint(
+    request: Request,
     id: Optional[int] = None,
     user_id: Optional[int] = None,
     username: Optional[str] = None,
     email: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db_session),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db_session),
     current_user: dict = Depends(require_role("admin", "customer"))
 ):
-    orders = await read_order(id, user_id, username, email, skip, limit, db, current_user)
+    async def build():
+        orders, next_cursor = await read_order_page(id, user_id, username, email, skip, limit, db, current_user, cursor)
+
+        if not orders:
+            raise HTTPException(status_code=404, detail="Orders not found")
+
+        # El cursor de la página siguiente viaja en la cabecera para no cambiar el cuerpo de la respuesta
+        return orders, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    return await cached_response(request, current_user, ORDER_LIST_ADAPTER, build)
+
+@router.get("/stats/products", response_model=List[SalesStat])
+async def get_sales_by_product_endpoint(
+    limit: int = Query(10, ge=1, le=STATS_MAX_LIMIT),
+    db: AsyncSession = Depends(get_db_session),
+    current_user: dict = Depends(require_role("admin"))
+):
+    return await sales_by_product(db, limit)
 
-    if not orders:
-        raise HTTPException(status_code=404, detail="Orders not found")
-    
-    return orders
+@router.get("/stats/customers", response_model=List[SalesStat])
+async def get_sales_by_customer_endpoint(
+    limit: int = Query(10, ge=1, le=STATS_MAX_LIMIT),
+    db: AsyncSession = Depends(get_db_session),
+    current_user: dict = Depends(require_role("admin"))
+):
+    return await sales_by_customer(db, limit)
+
+@router.get("/stats/periods", response_model=List[SalesPeriodStat])
+async def get_sales_by_period_endpoint(
+    granularity: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: dict = Depends(require_role("admin"))
+):
+    return await sales_by_period(db, granularity, date_from, date_to)
 
 @router.post("/", response_model=OrderRead, status_code=201)
-async def add_order_endpoint(order: OrderCreate, db: Session = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
+async def add_order_endpoint(order: OrderCreate, db: AsyncSession = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
     return await create_order(order, db, current_user)
 
+@router.post("/bulk", response_model=OrderBulkResult, status_code=201)
+async def add_orders_bulk_endpoint(
+    orders: List[OrderCreate],
+    response: Response,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: dict = Depends(require_role("admin", "customer"))
+):
+    created, errors = await create_orders_bulk(orders, db, current_user)
+    # 201 si se ha creado al menos un pedido; los errores de cada elemento van en el cuerpo
+    if not created and errors:
+        response.status_code = 422
+    return OrderBulkResult(created=created, errors=errors)
+
 @router.put("/{id}", response_model=OrderRead)
-async def update_order_endpoint(id: int, order_update: OrderUpdate, db: Session = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
+async def update_order_endpoint(id: int, order_update: OrderUpdate, db: AsyncSession = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
     return await update_order(id, order_update, db, current_user)
 
 @router.delete("/{id}")
-async def delete_order_endpoint(id: int, db: Session = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
+async def delete_order_endpoint(id: int, db: AsyncSession = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
     return await delete_order(id, db, current_user)
 
+@router.get("/exports/{job_id}")
+async def get_order_export_job_endpoint(job_id: str, current_user: dict = Depends(require_role("admin", "customer"))):
+    return get_report_job(job_id, current_user)
+
+@router.get("/exports/{job_id}/download")
+async def download_order_export_endpoint(job_id: str, current_user: dict = Depends(require_role("admin", "customer"))):
+    job = get_report_job(job_id, current_user)
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Report job is {job['status']}")
+
+    path = artifact_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Report artifact expired, submit the export again")
+
+    extension, media_type = REPORT_FORMATS[job["format"]]
+    return FileResponse(path, media_type=media_type, filename=f"{job['customer_name']}_orders{extension}")
+
+@router.post("/{customer_name}/exports", status_code=202)
+async def submit_order_export_endpoint(
+    customer_name: str,
+    format: str,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: dict = Depends(require_role("admin", "customer"))
+):
+    return await submit_report_job(customer_name, format, skip, limit, current_user)
+
 @router.get("/{customer_name}/pdf")
 async def get_order_pdf_endpoint(
     customer_name: str,
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db_session),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
     current_user: dict = Depends(require_role("admin", "customer"))
 ):
-    data = await read_order(None, None, customer_name, None, skip, limit, db, current_user)
-
-    # Convertir los objetos Pydantic a diccionarios
-    dict_data = [item.model_dump() for item in data]
+    # Se leen como mucho PDF_MAX_ORDERS + 1 pedidos; si hay más se responde 413
+    data = await collect_pdf_orders([], iter_order_batches(customer_name, current_user, skip, pdf_limit(limit)))
 
-    return generate_pdf(customer_name, dict_data)
+    return await generate_pdf(customer_name, data)
 
 @router.get("/{customer_name}/excel")
 async def get_order_excel_endpoint(
     customer_name: str,
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db_session),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
     current_user: dict = Depends(require_role("admin", "customer"))
 ):
-    data = await read_order(None, None, customer_name, None, skip, limit, db, current_user)
-
-    dict_data = [item.model_dump() for item in data]
-
-    # Devuelve directamente el StreamingResponse de generate_excel
-    return generate_excel(customer_name, dict_data)
+    # El Excel se escribe en modo constant_memory a un fichero temporal que se envía al cliente
+    return await generate_excel(customer_name, iter_order_batches(customer_name, current_user, skip, limit))
 
 
 @router.get("/{customer_name}/csv")
 async def get_order_csv_endpoint(
     customer_name: str,
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db_session),
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
     current_user: dict = Depends(require_role("admin", "customer"))
 ):
-    data = await read_order(None, None, customer_name, None, skip, limit, db, current_user)
-    
-    # Convertir los objetos Pydantic a diccionarios
-    dict_data = [item.model_dump() for item in data]
-
-    return generate_csv(customer_name, dict_data)
+    # Las filas se envían lote a lote mientras se leen de la base de datos
+    return await generate_csv(customer_name, iter_order_batches(customer_name, current_user, skip, limit))
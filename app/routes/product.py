@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 
-from app.clients.dummy_json_client import get_products, get_product_by_name
+from app.clients.dummy_json_client import get_products, get_product_by_name, search_products
 
 router = APIRouter(prefix="/products", tags=["products"])
 
@@ -12,6 +12,13 @@ async def list_products(skip: int = 0, limit: int = 10):
         return JSONResponse(status_code=502, content={"detail": "Failed to fetch products"})
     return products
 
+@router.get("/search")
+async def search_products_endpoint(q: str, limit: int = 10):
+    products = await search_products(q, limit)
+    if products is None:
+        return JSONResponse(status_code=502, content={"detail": "Failed to fetch products"})
+    return products
+
 @router.get("/{product_name}")
 async def list_products_by_name(product_name: str):
     products = await get_product_by_name(product_name)
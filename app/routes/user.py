@@ -1,39 +1,47 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.auth.dependencies import require_role
-from app.services.user import create_user, delete_user, read_users, update_user
+from app.services.user import create_user, delete_user, read_users_page, update_user
 from app.models.user import UserCreate, UserRead, UserUpdate
 from app.db.database import get_db_session
+from app.utils.response_cache import cached_response
+from app.utils.serialization import USER_LIST_ADAPTER, user_reads
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/", response_model=List[UserRead])
-def get_users_endpoint(
+async def get_users_endpoint(
+    request: Request,
     id: Optional[int] = None,
     username: Optional[str] = None,
     email: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db_session),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db_session),
     current_user: dict = Depends(require_role("admin", "customer"))
 ):
-    users = read_users(id, username, email, skip, limit, db, current_user)
+    async def build():
+        users, next_cursor = await read_users_page(id, username, email, skip, limit, db, current_user, cursor)
 
-    if not users:
-        raise HTTPException(status_code=404, detail="Users not found")
-    
-    return users
+        if not users:
+            raise HTTPException(status_code=404, detail="Users not found")
+
+        # El cursor de la página siguiente viaja en la cabecera para no cambiar el cuerpo de la respuesta
+        return user_reads(users), {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    return await cached_response(request, current_user, USER_LIST_ADAPTER, build)
 
 @router.post("/", response_model=UserRead, status_code=201)
-def add_user_endpoint(user: UserCreate, db: Session = Depends(get_db_session), current_user: dict = Depends(require_role("admin"))):
-    return create_user(user, db, current_user)
+async def add_user_endpoint(user: UserCreate, db: AsyncSession = Depends(get_db_session), current_user: dict = Depends(require_role("admin"))):
+    return await create_user(user, db, current_user)
         
 @router.put("/{id}", response_model=UserRead)
-def update_user_endpoint(id: int, user_update: UserUpdate, db: Session = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
-    return update_user(id, user_update, db, current_user)
+async def update_user_endpoint(id: int, user_update: UserUpdate, db: AsyncSession = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
+    return await update_user(id, user_update, db, current_user)
     
 @router.delete("/{id}")
-async def delete_user_endpoint(id: int, db: Session = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
+async def delete_user_endpoint(id: int, db: AsyncSession = Depends(get_db_session), current_user: dict = Depends(require_role("admin", "customer"))):
     return await delete_user(id, db, current_user)
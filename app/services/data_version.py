@@ -0,0 +1,31 @@
+from app.db.redis_client import redis_client
+
+# Contadores de versión por cliente: cambian cada vez que se modifica uno de sus pedidos o su usuario,
+# de modo que cualquier dato derivado (informes, respuestas cacheadas) puede indexarse por versión
+DATA_VERSION_PREFIX = "data_version:"
+ALL_CUSTOMERS = "*"
+
+_local_versions = {}
+
+async def get_data_version(username: str) -> int:
+    if redis_client:
+        try:
+            version = await redis_client.get(f"{DATA_VERSION_PREFIX}{username}")
+            return int(version or 0)
+        except Exception as e:
+            print(f"Redis error: {e}")
+    return _local_versions.get(username, 0)
+
+async def bump_data_version(*usernames: str):
+    # Además de cada cliente afectado se incrementa la versión global (listados de admin)
+    scopes = set(usernames) | {ALL_CUSTOMERS}
+    for scope in scopes:
+        _local_versions[scope] = _local_versions.get(scope, 0) + 1
+    if redis_client:
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for scope in scopes:
+                    pipe.incr(f"{DATA_VERSION_PREFIX}{scope}")
+                await pipe.execute()
+        except Exception as e:
+            print(f"Redis error: {e}")
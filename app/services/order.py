@@ -1,23 +1,43 @@
-from typing import Optional
+import os
+from datetime import datetime
+from logging import getLogger
+from typing import List, Optional
+from dotenv import load_dotenv
 from fastapi import Depends, HTTPException
-from sqlmodel import Session, select
+from sqlalchemy import delete, exists, insert, update
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.clients.dummy_json_client import get_product_by_name, get_products
-from app.db.database import get_db_session
-from app.models.order import Order, OrderCreate, OrderRead, OrderUpdate
+from app.clients.dummy_json_client import get_product_by_id, get_product_by_name, get_products_by_ids, get_products_by_names
+from app.db.database import engine, get_db_session, session_scope
+from app.services.data_version import bump_data_version
+from app.services.sales_stats import apply_sales_deltas
+from app.utils.pagination import paginate, split_page
+from app.models.order import Order, OrderBulkError, OrderCreate, OrderRead, OrderUpdate
 from app.models.user import User
 
-async def read_order(
+load_dotenv()
+
+logger = getLogger(__name__)
+
+# Tamaño de cada lote de pedidos en las exportaciones en streaming
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Creación masiva: máximo de elementos por petición y filas por sentencia
+# (los drivers limitan el número de parámetros de una sola sentencia a ~32k)
+ORDER_BULK_MAX_ITEMS = int(os.getenv("ORDER_BULK_MAX_ITEMS", "10000"))
+ORDER_BULK_CHUNK_SIZE = int(os.getenv("ORDER_BULK_CHUNK_SIZE", "1000"))
+
+def order_list_query(
+    current_user: dict,
     id: Optional[int] = None,
     user_id: Optional[int] = None,
     username: Optional[str] = None,
-    email: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db_session),
-    current_user: dict = Depends()
+    email: Optional[str] = None
 ):
-    query = select(Order.id, Order.product_id, Order.quantity, User.username, Order.created_at).join(User, Order.user_id == User.id)
+    query = select(
+        Order.id, Order.product_id, Order.quantity, User.username, Order.created_at, Order.product_title, Order.unit_price
+    ).join(User, Order.user_id == User.id)
 
     if current_user["role"] in ["customer"]:
         query = query.where(User.username == current_user["sub"])
@@ -29,19 +49,49 @@ async def read_order(
         query = query.where(User.username == username)
     if email:
         query = query.where(User.email == email)
+    return query
+
+async def _products_without_snapshot(rows) -> dict:
+    # Solo los pedidos anteriores a la copia del producto (sin backfill) se enriquecen desde DummyJSON
+    missing = {row[1] for row in rows if row[5] is None}
+    return await get_products_by_ids(missing) if missing else {}
 
-    query = query.offset(skip).limit(limit)
+def _order_product(row, products: dict) -> tuple:
+    # (título, precio) de una fila de order_list_query
+    if row[5] is not None:
+        return row[5], row[6]
+    product = products[row[1]]
+    return product["title"], float(product["price"])
+
+async def read_order_page(
+    id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: dict = Depends(),
+    cursor: Optional[str] = None
+):
+    # Devuelve (pedidos, next_cursor); con `cursor` se usa keyset sobre (created_at, id) y se ignora `skip`
+    query = order_list_query(current_user, id, user_id, username, email)
+    query = paginate(query, Order.created_at, Order.id, skip, limit, cursor)
     
     try:
-        orders = db.execute(query).fetchall()
-    
+        orders = (await db.execute(query)).fetchall()
+        orders, next_cursor = split_page(orders, limit, lambda order: order[4], lambda order: order[0])
+
+        products = await _products_without_snapshot(orders)
+
         new_orders = []
         for order in orders:
-            product = await get_products(None, None, order[1])
-            order_read = OrderRead(
+            title, price = _order_product(order, products)
+            # model_construct: los datos vienen de la base de datos, no hace falta validarlos
+            order_read = OrderRead.model_construct(
                 id=order[0],
-                product=product["title"],
-                price=product["price"],
+                product=title,
+                price=price,
                 quantity=order[2],
                 customer_username=order[3],
                 created_at=order[4]
@@ -50,16 +100,81 @@ async def read_order(
     except Exception as e:
         raise Exception(e)
 
-    return new_orders
+    return new_orders, next_cursor
+
+async def read_order(
+    id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: dict = Depends()
+):
+    orders, _ = await read_order_page(id, user_id, username, email, skip, limit, db, current_user)
+    return orders
+
+async def _order_batches(db, query, skip: int, limit: Optional[int], batch_size: int):
+    # Paginación keyset sobre (created_at, id), igual que el listado: cada lote recorre ix_order_user_id_created_at_id
+    cursor = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        page = paginate(query, Order.created_at, Order.id, 0 if cursor else skip, size, cursor)
+        rows = (await db.execute(page)).fetchall()
+        rows, cursor = split_page(rows, size, lambda row: row[4], lambda row: row[0])
+        if not rows:
+            break
+
+        products = await _products_without_snapshot(rows)
+        batch = []
+        for row in rows:
+            title, price = _order_product(row, products)
+            batch.append({
+                "quantity": row[2],
+                "id": row[0],
+                "customer_username": row[3],
+                "product": title,
+                "price": price,
+                "created_at": row[4]
+            })
+        yield batch
+
+        if remaining is not None:
+            remaining -= len(rows)
+        if cursor is None:
+            break
+
+async def iter_order_batches(
+    username: str,
+    current_user: dict,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    db: AsyncSession = None
+):
+    # Genera los pedidos de un cliente en lotes de diccionarios (mismas claves que OrderRead).
+    # Sin `db` abre su propia sesión, para poder consumirse después de cerrar la de la petición
+    query = order_list_query(current_user, username=username)
+
+    if db is not None:
+        async for batch in _order_batches(db, query, skip, limit, batch_size):
+            yield batch
+        return
+
+    async with session_scope() as session:
+        async for batch in _order_batches(session, query, skip, limit, batch_size):
+            yield batch
 
 async def create_order(
     order_create: OrderCreate, 
-    db: Session = Depends(get_db_session), 
+    db: AsyncSession = Depends(get_db_session), 
     current_user: dict = Depends()
 ):
     # Validar que el customer_username existe en la base de datos de usuarios
     owner_query = select(User).where(User.username == order_create.customer_username)
-    owner = db.exec(owner_query).first()
+    owner = (await db.exec(owner_query)).first()
 
     product = await get_product_by_name(order_create.product)
 
@@ -76,90 +191,209 @@ async def create_order(
         new_order = Order(
         quantity=order_create.quantity,
         user_id=owner.id,
-        product_id=product["id"]
+        product_id=product["id"],
+        product_title=product["title"],
+        unit_price=float(product["price"])
         )
         db.add(new_order)
-        db.commit()
-        db.refresh(new_order)
+        await apply_sales_deltas(db, [(owner.id, product["id"], new_order.created_at, new_order.quantity, new_order.unit_price, 1)])
+        await db.commit()
+        await db.refresh(new_order)
+        await bump_data_version(owner.username)
 
         returned_new_list = OrderRead(
         id=new_order.id,
         quantity=new_order.quantity,
-        product=product["title"],
-        price=product["price"],
+        product=new_order.product_title,
+        price=new_order.unit_price,
         customer_username=owner.username,
         created_at=new_order.created_at
     )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise Exception(e)
 
     return returned_new_list 
 
-async def update_order(
-    id: int,
-    order_update: OrderUpdate,
-    db: Session = Depends(get_db_session),
+async def create_orders_bulk(
+    order_creates: List[OrderCreate],
+    db: AsyncSession = Depends(get_db_session),
     current_user: dict = Depends()
 ):
-    query = select(Order).where(Order.id == id)
-    order = db.exec(query).first()
+    # Devuelve (pedidos creados, errores por elemento). Los elementos válidos se insertan en una
+    # única transacción; los inválidos se informan con el mismo código que daría POST /orders/
+    if len(order_creates) > ORDER_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A bulk request accepts at most {ORDER_BULK_MAX_ITEMS} items")
 
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+    usernames = list(dict.fromkeys(item.customer_username for item in order_creates))
+    owners = {}
+    for offset in range(0, len(usernames), ORDER_BULK_CHUNK_SIZE):
+        chunk = usernames[offset:offset + ORDER_BULK_CHUNK_SIZE]
+        rows = (await db.execute(select(User.id, User.username).where(User.username.in_(chunk)))).fetchall()
+        owners.update({row[1]: row[0] for row in rows})
 
-    for key, value in order_update.dict(exclude_unset=True).items():
-        setattr(order, key, value)
+    products = await get_products_by_names(item.product for item in order_creates)
 
-    owner_query = select(User).where(User.id == order.user_id)
-    owner = db.exec(owner_query).first()
+    rows = []
+    errors = []
+    for index, item in enumerate(order_creates):
+        owner_id = owners.get(item.customer_username)
+        product = products.get(item.product)
+        if owner_id is None:
+            errors.append(OrderBulkError(index=index, status_code=404, detail="Owner not found"))
+        elif product is None:
+            errors.append(OrderBulkError(index=index, status_code=404, detail="Product not found"))
+        elif current_user["role"] in ["customer"] and current_user["sub"] != item.customer_username:
+            errors.append(OrderBulkError(index=index, status_code=403, detail="Insufficient permissions to create order to other users"))
+        else:
+            rows.append({
+                "quantity": item.quantity,
+                "user_id": owner_id,
+                "product_id": product["id"],
+                "product_title": product["title"],
+                "unit_price": float(product["price"]),
+                "created_at": datetime.utcnow()
+            })
 
-    if current_user["role"] in ["customer"] and current_user["sub"] != owner.username:
-        raise HTTPException(status_code=403, detail="Insufficient permissions to update order to other users")
+    if not rows:
+        return [], errors
 
+    usernames_by_id = {user_id: username for username, user_id in owners.items()}
+    created = []
     try:
-        db.add(order)
-        db.commit()
-        db.refresh(order)
+        for offset in range(0, len(rows), ORDER_BULK_CHUNK_SIZE):
+            statement = insert(Order).values(rows[offset:offset + ORDER_BULK_CHUNK_SIZE]).returning(
+                Order.id, Order.user_id, Order.product_title, Order.unit_price, Order.quantity, Order.created_at
+            )
+            for row in (await db.execute(statement)).fetchall():
+                created.append(OrderRead.model_construct(
+                    id=row[0],
+                    quantity=row[4],
+                    product=row[2],
+                    price=row[3],
+                    customer_username=usernames_by_id[row[1]],
+                    created_at=row[5]
+                ))
+        await apply_sales_deltas(db, [
+            (row["user_id"], row["product_id"], row["created_at"], row["quantity"], row["unit_price"], 1)
+            for row in rows
+        ])
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise Exception(e)
 
-        product = await get_products(None, None, order.id)
+    await bump_data_version(*{order.customer_username for order in created})
+    return created, errors
 
-        returned_new_list = OrderRead(
-        id=order.id,
-        product=product["title"],
-        price=product["price"],
-        quantity=order.quantity,
-        customer_username=owner.username,
-        created_at=order.created_at
+def _owned_orders(statement, current_user: dict):
+    # Autorización en SQL: un cliente solo puede modificar sus pedidos (subconsulta sobre User en el WHERE)
+    if current_user["role"] in ["customer"]:
+        owner_id = select(User.id).where(User.username == current_user["sub"]).scalar_subquery()
+        statement = statement.where(Order.user_id == owner_id)
+    return statement
+
+# Columnas devueltas por las escrituras (RETURNING): el pedido, su copia del producto y el nombre del cliente
+def _returned_order_columns():
+    owner_username = select(User.username).where(User.id == Order.user_id).correlate_except(User).scalar_subquery()
+    return (
+        Order.id, Order.user_id, Order.product_id, Order.quantity, Order.created_at,
+        Order.product_title, Order.unit_price, owner_username
     )
+
+async def _raise_not_modified(db: AsyncSession, id: int, action: str):
+    # La escritura no afectó a ninguna fila: 403 si el pedido existe (es de otro cliente), 404 si no
+    if (await db.execute(select(exists().where(Order.id == id)))).scalar():
+        raise HTTPException(status_code=403, detail=f"Insufficient permissions to {action} order to other users")
+    raise HTTPException(status_code=404, detail="Order not found")
+
+async def _returned_product(row) -> tuple:
+    # (título, precio) copiados en el pedido o, en pedidos antiguos sin backfill, los actuales de DummyJSON
+    if row[5] is not None:
+        return row[5], row[6]
+    product = await get_product_by_id(row[2])
+    return (product["title"], float(product["price"])) if product else (None, None)
+
+def _summary_price(row, price) -> float:
+    # Sin precio (pedido sin copia del producto y DummyJSON caído o sin el producto) la variación se
+    # aplica igual con ingresos 0: unidades y número de pedidos no se desvían del resumen
+    if price is not None:
+        return price
+    logger.warning(
+        f"Order {row[0]}: no price for product {row[2]}, sales summary revenue not updated "
+        "(run `python -m app.services.sales_stats rebuild` to recompute it)"
+    )
+    return 0.0
+
+async def update_order(
+    id: int,
+    order_update: OrderUpdate,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: dict = Depends()
+):
+    values = order_update.dict(exclude_unset=True)
+    if not values:
+        # Nada que modificar: se devuelve el pedido con la misma comprobación de permisos
+        row = (await db.execute(_owned_orders(select(*_returned_order_columns()).where(Order.id == id), current_user))).first()
+        if row is None:
+            await _raise_not_modified(db, id, "update")
+        previous_quantity = row[3]
+    else:
+        statement = _owned_orders(update(Order).where(Order.id == id), current_user).values(**values)
+        if engine.dialect.name == "postgresql":
+            # UPDATE ... FROM sobre la propia tabla: RETURNING incluye la cantidad anterior en el mismo viaje
+            previous = aliased(Order)
+            statement = statement.where(previous.id == Order.id).returning(*_returned_order_columns(), previous.quantity)
+            row = (await db.execute(statement)).first()
+            previous_quantity = row[8] if row is not None else None
+        else:
+            # SQLite no admite columnas de la tabla del FROM en RETURNING: la cantidad anterior se lee antes
+            previous_quantity = (await db.execute(select(Order.quantity).where(Order.id == id))).scalar()
+            row = (await db.execute(statement.returning(*_returned_order_columns()))).first()
+        if row is None:
+            await db.rollback()
+            await _raise_not_modified(db, id, "update")
+
+    title, price = await _returned_product(row)
+
+    try:
+        if row[3] != previous_quantity:
+            await apply_sales_deltas(db, [(row[1], row[2], row[4], row[3] - previous_quantity, _summary_price(row, price), 0)])
+        await db.commit()
+        await bump_data_version(row[7])
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise Exception(e)
 
-    return returned_new_list
+    return OrderRead.model_construct(
+        id=row[0],
+        product=title,
+        price=price,
+        quantity=row[3],
+        customer_username=row[7],
+        created_at=row[4]
+    )
 
 async def delete_order(
     id: int, 
-    db: Session = Depends(get_db_session), 
+    db: AsyncSession = Depends(get_db_session), 
     current_user: dict = Depends()
 ):
-    query = select(Order).where(Order.id == id)
-    order = db.exec(query).first()
+    statement = _owned_orders(delete(Order).where(Order.id == id), current_user).returning(*_returned_order_columns())
+    row = (await db.execute(statement)).first()
 
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+    if row is None:
+        await db.rollback()
+        await _raise_not_modified(db, id, "update")
+
+    _, price = await _returned_product(row)
 
-    owner_query = select(User).where(User.id == order.user_id)
-    owner = db.exec(owner_query).first()
-    
-    if current_user["role"] in ["customer"] and current_user["sub"] != owner.username:
-        raise HTTPException(status_code=403, detail="Insufficient permissions to update order to other users")
-    
     try:
-        db.delete(order)
-        db.commit()
+        await apply_sales_deltas(db, [(row[1], row[2], row[4], -row[3], _summary_price(row, price), -1)])
+        await db.commit()
+        await bump_data_version(row[7])
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise Exception(e)
 
     return {"detail": "Order deleted successfully"}
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from logging import getLogger
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlmodel import select
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import session_scope
+from app.models.order import Order
+from app.models.user import User
+from app.services.order import iter_order_batches
+from app.utils.processes import process_alive, process_key
+from app.utils.report_generator import check_pdf_size, collect_pdf_orders, pdf_limit, peek_batch, render_pdf, write_csv, write_excel
+
+load_dotenv()
+
+logger = getLogger(__name__)
+
+# Directorio local de artefactos y estado de los trabajos (compartido por los workers del mismo host)
+REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.join(tempfile.gettempdir(), "online_shop_reports"))
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_QUEUE_SIZE = int(os.getenv("REPORT_QUEUE_SIZE", "100"))
+REPORT_ARTIFACT_TTL_SECONDS = int(os.getenv("REPORT_ARTIFACT_TTL_SECONDS", "86400"))
+
+REPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "pdf": (".pdf", "application/pdf"),
+}
+
+# Un trabajo pendiente o en curso solo vive en la cola del proceso que lo aceptó
+INTERRUPTED_ERROR = "Interrupted by a server shutdown, submit the export again"
+
+_queue: asyncio.Queue = None
+_workers = []
+_prune_task = None
+
+def _jobs_dir() -> str:
+    return os.path.join(REPORTS_DIR, "jobs")
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(_jobs_dir(), f"{job_id}.json")
+
+def artifact_key(customer_name: str, report_format: str, skip: int, limit: Optional[int], fingerprint: list) -> str:
+    raw = json.dumps([customer_name, report_format, skip, limit, fingerprint])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+async def orders_fingerprint(customer_name: str) -> list:
+    # Estado de los pedidos del cliente leído de la base de datos: a diferencia de la versión de datos
+    # (Redis o memoria) no vuelve a 0 al reiniciar, así que un artefacto antiguo no puede reutilizarse.
+    # Altas y bajas cambian el número y el id máximo; una cantidad modificada cambia las dos sumas;
+    # el backfill de la copia del producto cambia el número de pedidos con precio
+    query = (
+        select(
+            func.count(Order.id),
+            func.max(Order.id),
+            func.sum(Order.quantity),
+            func.sum(Order.id * Order.quantity),
+            func.count(Order.unit_price),
+            func.max(Order.created_at)
+        )
+        .join(User, Order.user_id == User.id)
+        .where(User.username == customer_name)
+    )
+    async with session_scope() as db:
+        row = (await db.execute(query)).first()
+    return [str(value) for value in row]
+
+def artifact_path(job: dict) -> str:
+    return os.path.join(REPORTS_DIR, f"{job['key']}{REPORT_FORMATS[job['format']][0]}")
+
+def _save_job(job: dict):
+    # Escritura atómica: otro worker puede estar leyendo el estado al mismo tiempo
+    tmp_path = f"{_job_path(job['job_id'])}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(job, file)
+    os.replace(tmp_path, _job_path(job["job_id"]))
+
+def get_report_job(job_id: str, current_user: dict) -> dict:
+    try:
+        uuid.UUID(job_id)
+        with open(_job_path(job_id)) as file:
+            job = json.load(file)
+    except (ValueError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="Report job not found")
+
+    if current_user["role"] in ["customer"] and current_user["sub"] != job["customer_name"]:
+        raise HTTPException(status_code=403, detail="Insufficient permissions to access reports of other users")
+    if job["status"] in ("pending", "running") and not process_alive(job.get("owner", "")):
+        # El proceso que lo tenía en su cola terminó sin marcarlo (p. ej. lo mataron): no va a acabar nunca
+        _interrupt(job)
+    return job
+
+def _interrupt(job: dict):
+    job["status"] = "failed"
+    job["error"] = INTERRUPTED_ERROR
+    job["finished_at"] = time.time()
+    _save_job(job)
+
+def _prune_artifacts():
+    cutoff = time.time() - REPORT_ARTIFACT_TTL_SECONDS
+    for directory in (REPORTS_DIR, _jobs_dir()):
+        for entry in os.scandir(directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+async def _prune_loop():
+    # Cada cambio en los pedidos de un cliente genera una clave nueva: los artefactos antiguos se
+    # borran periódicamente, no solo al arrancar
+    while True:
+        await asyncio.sleep(max(REPORT_ARTIFACT_TTL_SECONDS / 2, 1))
+        try:
+            await run_in_threadpool(_prune_artifacts)
+        except OSError as e:
+            logger.error(f"Report artifact prune failed: {e}")
+
+async def submit_report_job(customer_name: str, report_format: str, skip: int, limit: Optional[int], current_user: dict) -> dict:
+    if report_format not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{report_format}'")
+    if current_user["role"] in ["customer"] and current_user["sub"] != customer_name:
+        raise HTTPException(status_code=403, detail="Insufficient permissions to export orders of other users")
+
+    fingerprint = await orders_fingerprint(customer_name)
+    if report_format == "pdf":
+        # El primer valor de la huella es el número de pedidos del cliente
+        orders = max(int(fingerprint[0]) - skip, 0)
+        check_pdf_size(min(orders, limit) if limit is not None else orders)
+    job = {
+        "job_id": str(uuid.uuid4()),
+        "customer_name": customer_name,
+        "format": report_format,
+        "skip": skip,
+        "limit": limit,
+        "key": artifact_key(customer_name, report_format, skip, limit, fingerprint),
+        "status": "pending",
+        "owner": process_key(),
+        "error": None,
+        "created_at": time.time(),
+        "finished_at": None
+    }
+
+    # Mismo cliente, formato, filtro y estado de sus pedidos: el artefacto ya generado se sirve tal cual
+    if os.path.exists(artifact_path(job)):
+        job["status"] = "done"
+        job["finished_at"] = job["created_at"]
+        _save_job(job)
+        return job
+
+    if _queue is None or _queue.full():
+        raise HTTPException(status_code=503, detail="Report queue is full, try again later", headers={"Retry-After": "5"})
+    _save_job(job)
+    _queue.put_nowait(job)
+    return job
+
+async def _render(job: dict):
+    path = artifact_path(job)
+    tmp_path = f"{path}.{job['job_id']}.tmp"
+    # El filtro de rol ya se aplicó al enviar el trabajo; aquí se exporta el cliente completo
+    limit = pdf_limit(job["limit"]) if job["format"] == "pdf" else job["limit"]
+    batches = iter_order_batches(job["customer_name"], {"sub": job["customer_name"], "role": "admin"}, job["skip"], limit)
+    first = await peek_batch(batches)
+    if not first:
+        raise ValueError("No orders found")
+
+    try:
+        if job["format"] == "csv":
+            await write_csv(tmp_path, first, batches)
+        elif job["format"] == "excel":
+            await write_excel(tmp_path, first, batches)
+        else:
+            data = await collect_pdf_orders(first, batches)
+            content = await render_pdf(job["customer_name"], data)
+            with open(tmp_path, "wb") as file:
+                file.write(content)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+async def _worker():
+    while True:
+        job = await _queue.get()
+        try:
+            # Otro trabajo idéntico puede haber generado el artefacto mientras este esperaba
+            if not os.path.exists(artifact_path(job)):
+                job["status"] = "running"
+                _save_job(job)
+                await _render(job)
+            job["status"] = "done"
+        except asyncio.CancelledError:
+            # Parada del proceso con el trabajo a medias
+            job["status"] = "failed"
+            job["error"] = INTERRUPTED_ERROR
+            raise
+        except Exception as e:
+            logger.error(f"Report job {job['job_id']} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+            _save_job(job)
+            _queue.task_done()
+
+async def start_report_workers():
+    global _queue, _prune_task
+    os.makedirs(_jobs_dir(), exist_ok=True)
+    await run_in_threadpool(_prune_artifacts)
+    _queue = asyncio.Queue(maxsize=REPORT_QUEUE_SIZE)
+    for _ in range(REPORT_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+    _prune_task = asyncio.create_task(_prune_loop())
+
+async def stop_report_workers():
+    global _prune_task
+    tasks = _workers + ([_prune_task] if _prune_task is not None else [])
+    _workers.clear()
+    _prune_task = None
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    # Los trabajos que seguían en la cola no los va a atender nadie
+    while _queue is not None and not _queue.empty():
+        _interrupt(_queue.get_nowait())
@@ -0,0 +1,219 @@
+"""Estadísticas de ventas a partir de la tabla de agregados `sales_summary`.
+
+create_order, create_orders_bulk, update_order y delete_order aplican su variación (unidades, ingresos
+y número de pedidos) en la misma transacción que el pedido, con un upsert multi-fila. Las consultas
+de los paneles leen unas pocas filas indexadas en lugar de recorrer y enriquecer todos los pedidos.
+
+Reconstrucción completa a partir de los pedidos: python -m app.services.sales_stats rebuild
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date, datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import case, delete, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.clients.dummy_json_client import get_products_by_ids
+from app.clients.http_client import close_http_client
+from app.db.database import dispose_engines, engine, session_scope
+from app.models.order import Order
+from app.models.sales import SalesPeriodStat, SalesStat, SalesSummary
+from app.models.user import User
+
+# Filas por sentencia en la reconstrucción
+SALES_REBUILD_CHUNK_SIZE = 1000
+
+def _day(created_at) -> str:
+    return (created_at.date() if isinstance(created_at, datetime) else created_at).isoformat()
+
+def _add_revenue(totals: dict, key, units: int, revenue: float, orders: int):
+    total = totals.setdefault(key, [0, 0.0, 0])
+    total[0] += units
+    total[1] += revenue
+    total[2] += orders
+
+def sales_deltas(entries) -> list:
+    # entries: (user_id, product_id, created_at, quantity, unit_price, orders); orders = 1 al crear,
+    # 0 al modificar la cantidad y -1 al borrar (con la cantidad en negativo)
+    deltas = {}
+    for user_id, product_id, created_at, quantity, unit_price, orders in entries:
+        for key in (("product", str(product_id)), ("customer", str(user_id)), ("day", _day(created_at))):
+            _add_revenue(deltas, key, quantity, quantity * float(unit_price), orders)
+    return _summary_rows(deltas)
+
+def _summary_rows(totals: dict) -> list:
+    # Orden fijo de las filas: las transacciones concurrentes bloquean las filas en el mismo orden (sin interbloqueos)
+    return [
+        {"dimension": dimension, "bucket": bucket, "units": units, "revenue": round(revenue, 2), "orders": orders}
+        for (dimension, bucket), (units, revenue, orders) in sorted(totals.items())
+    ]
+
+def _upsert(rows: list):
+    # INSERT ... ON CONFLICT (dimension, bucket) DO UPDATE sumando la variación (Postgres y SQLite)
+    dialect_insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(SalesSummary).values(rows)
+    table = SalesSummary.__table__
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.dimension, table.c.bucket],
+        set_={
+            "units": table.c.units + statement.excluded.units,
+            "revenue": table.c.revenue + statement.excluded.revenue,
+            "orders": table.c.orders + statement.excluded.orders
+        }
+    )
+
+async def apply_sales_deltas(db: AsyncSession, entries):
+    # No hace commit: se confirma junto con la escritura del pedido
+    rows = sales_deltas(entries)
+    if rows:
+        await db.execute(_upsert(rows))
+
+async def rebuild_sales_summary() -> int:
+    # Agrega en SQL por (cliente, producto) y por (día, producto)
+    async with session_scope() as db:
+        try:
+            if engine.dialect.name == "postgresql":
+                # Bloquea las escrituras de pedidos hasta el commit para no perder variaciones concurrentes
+                await db.execute(text('LOCK TABLE "order" IN SHARE MODE'))
+            # Ingresos con el precio copiado en cada pedido; las unidades sin copia (pedidos antiguos sin
+            # backfill) se valoran con el precio actual de DummyJSON
+            aggregates = (
+                func.sum(Order.quantity),
+                func.count(Order.id),
+                func.sum(Order.quantity * Order.unit_price),
+                func.sum(case((Order.unit_price.is_(None), Order.quantity), else_=0))
+            )
+            by_customer = (await db.execute(
+                select(Order.user_id, Order.product_id, *aggregates).group_by(Order.user_id, Order.product_id)
+            )).fetchall()
+            day = func.date(Order.created_at)
+            by_day = (await db.execute(
+                select(day, Order.product_id, *aggregates).group_by(day, Order.product_id)
+            )).fetchall()
+
+            products = await get_products_by_ids({row[1] for row in by_customer if row[5]})
+
+            def revenue(product_id, priced, unpriced_units) -> float:
+                return float(priced or 0) + int(unpriced_units or 0) * float(products.get(product_id, {}).get("price", 0))
+
+            totals = {}
+            for user_id, product_id, units, orders, priced, unpriced_units in by_customer:
+                amount = revenue(product_id, priced, unpriced_units)
+                _add_revenue(totals, ("product", str(product_id)), int(units), amount, orders)
+                _add_revenue(totals, ("customer", str(user_id)), int(units), amount, orders)
+            for bucket_day, product_id, units, orders, priced, unpriced_units in by_day:
+                # date() devuelve un date en Postgres y un texto AAAA-MM-DD en SQLite
+                _add_revenue(totals, ("day", str(bucket_day)[:10]), int(units), revenue(product_id, priced, unpriced_units), orders)
+
+            rows = _summary_rows(totals)
+            await db.execute(delete(SalesSummary))
+            for offset in range(0, len(rows), SALES_REBUILD_CHUNK_SIZE):
+                await db.execute(_upsert(rows[offset:offset + SALES_REBUILD_CHUNK_SIZE]))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    return len(rows)
+
+def sales_top_query(dimension: str, limit: int):
+    # Recorre ix_sales_summary_dimension_revenue en orden descendente: solo lee `limit` filas
+    return (
+        select(SalesSummary.bucket, SalesSummary.units, SalesSummary.revenue, SalesSummary.orders)
+        .where(SalesSummary.dimension == dimension)
+        .order_by(SalesSummary.revenue.desc())
+        .limit(limit)
+    )
+
+def sales_days_query(date_from: date, date_to: date):
+    # Rango sobre la clave primaria (dimension, bucket): los días en formato ISO se ordenan como texto
+    return (
+        select(SalesSummary.bucket, SalesSummary.units, SalesSummary.revenue, SalesSummary.orders)
+        .where(
+            SalesSummary.dimension == "day",
+            SalesSummary.bucket >= date_from.isoformat(),
+            SalesSummary.bucket <= date_to.isoformat()
+        )
+        .order_by(SalesSummary.bucket)
+    )
+
+async def sales_by_product(db: AsyncSession, limit: int = 10) -> list:
+    rows = (await db.execute(sales_top_query("product", limit))).fetchall()
+    products = await get_products_by_ids(int(row[0]) for row in rows)
+    return [
+        SalesStat.model_construct(
+            key=row[0],
+            label=products.get(int(row[0]), {}).get("title", row[0]),
+            units=row[1],
+            revenue=row[2],
+            orders=row[3]
+        )
+        for row in rows
+    ]
+
+async def sales_by_customer(db: AsyncSession, limit: int = 10) -> list:
+    rows = (await db.execute(sales_top_query("customer", limit))).fetchall()
+    user_ids = [int(row[0]) for row in rows]
+    usernames = dict((await db.execute(select(User.id, User.username).where(User.id.in_(user_ids)))).fetchall()) if user_ids else {}
+    return [
+        SalesStat.model_construct(
+            key=row[0],
+            label=usernames.get(int(row[0]), row[0]),
+            units=row[1],
+            revenue=row[2],
+            orders=row[3]
+        )
+        for row in rows
+    ]
+
+async def sales_by_period(
+    db: AsyncSession,
+    granularity: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+) -> list:
+    # Las semanas (ISO, empiezan en lunes) se agregan a partir de como mucho 7 filas diarias cada una
+    if granularity not in ("day", "week"):
+        raise HTTPException(status_code=400, detail="granularity must be 'day' or 'week'")
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=30)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+    if granularity == "week":
+        date_from -= timedelta(days=date_from.weekday())
+
+    periods = {}
+    for bucket, units, revenue, orders in (await db.execute(sales_days_query(date_from, date_to))).fetchall():
+        period_start = date.fromisoformat(bucket)
+        if granularity == "week":
+            period_start -= timedelta(days=period_start.weekday())
+        _add_revenue(periods, period_start, units, revenue, orders)
+
+    return [
+        SalesPeriodStat.model_construct(period_start=period_start, units=units, revenue=round(revenue, 2), orders=orders)
+        for period_start, (units, revenue, orders) in periods.items()
+    ]
+
+async def run_rebuild() -> int:
+    # Fuera de la aplicación (CLI, seeder): cierra el cliente HTTP y los engines al terminar
+    try:
+        return await rebuild_sales_summary()
+    finally:
+        await close_http_client()
+        await dispose_engines()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.services.sales_stats", description="Sales summary maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Recompute the sales summary from all orders")
+    parser.parse_args(argv)
+
+    rows = asyncio.run(run_rebuild())
+    print(f"Sales summary rebuilt: {rows} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
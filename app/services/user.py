@@ -1,21 +1,22 @@
 from datetime import datetime
 from typing import Optional
 from fastapi import Depends, HTTPException
-from sqlmodel import Session, select
+from sqlalchemy import exists
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.auth.hashing import hash_password
+from app.auth.hashing import hash_password_async
+from app.models.order import Order
 from app.models.user import User, UserCreate, UserUpdate
 from app.db.database import get_db_session
-from app.services.order import read_order
+from app.services.data_version import bump_data_version
+from app.utils.pagination import paginate, split_page
 
-def read_users(
+def user_list_query(
+    current_user: dict,
     id: Optional[int] = None,
     username: Optional[str] = None,
-    email: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db_session),
-    current_user: dict = Depends()
+    email: Optional[str] = None
 ):
     query = select(User)
 
@@ -27,55 +28,80 @@ def read_users(
         query = query.where(User.username == username)
     if email:
         query = query.where(User.email == email)
-    
+    return query
 
-    query = query.offset(skip).limit(limit)
+async def read_users_page(
+    id: Optional[int] = None,
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: dict = Depends(),
+    cursor: Optional[str] = None
+):
+    # Devuelve (usuarios, next_cursor); con `cursor` se usa keyset sobre (created_at, id) y se ignora `skip`
+    query = user_list_query(current_user, id, username, email)
+    query = paginate(query, User.created_at, User.id, skip, limit, cursor)
     
     try:
-        users = db.execute(query).scalars().all()
+        users = (await db.execute(query)).scalars().all()
     except Exception as e:
         raise Exception(e)
 
+    return split_page(users, limit, lambda user: user.created_at, lambda user: user.id)
+
+async def read_users(
+    id: Optional[int] = None,
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_db_session),
+    current_user: dict = Depends()
+):
+    users, _ = await read_users_page(id, username, email, skip, limit, db, current_user)
     return users
 
-def create_user(
+async def create_user(
     user: UserCreate, 
-    db: Session = Depends(get_db_session), 
+    db: AsyncSession = Depends(get_db_session), 
     current_user: dict = Depends()
 ):
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_async(user.password)
     new_user = User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password,
         created_at=datetime.utcnow()
     )
-    existing_user_username = db.exec(select(User).where(User.username == new_user.username)).first()
+    existing_user_username = (await db.exec(select(User).where(User.username == new_user.username))).first()
     if existing_user_username:
         raise HTTPException(status_code=409, detail=f"An user with username '{new_user.username}' already exists.")
     
-    existing_user_email = db.exec(select(User).where(User.email == new_user.email)).first()
+    existing_user_email = (await db.exec(select(User).where(User.email == new_user.email))).first()
     if existing_user_email:
         raise HTTPException(status_code=409, detail=f"An user with email '{new_user.email}' already exists.")
     
     try:
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise Exception(e)
-    
+
+    await bump_data_version(new_user.username)
     return new_user
 
-def update_user(
+async def update_user(
     id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_db_session),
     current_user: dict = Depends()
 ):
     query = select(User).where(User.id == id)
-    user = db.exec(query).first()    
+    user = (await db.exec(query)).first()    
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -83,34 +109,37 @@ def update_user(
     if current_user["role"] in ["customer", "viewer"] and current_user["sub"] != user.username:
         raise HTTPException(status_code=403, detail="Insufficient permissions to update other users")
     
-    existing_user_username = db.exec(select(User).where((User.username == user_update.username) & (User.id != id))).first()
+    existing_user_username = (await db.exec(select(User).where((User.username == user_update.username) & (User.id != id)))).first()
     if existing_user_username:
         raise HTTPException(status_code=409, detail=f"An user with username '{user_update.username}' already exists.")
     
-    existing_user_email = db.exec(select(User).where((User.email == user_update.email) & (User.id != id))).first()
+    existing_user_email = (await db.exec(select(User).where((User.email == user_update.email) & (User.id != id)))).first()
     if existing_user_email:
         raise HTTPException(status_code=409, detail=f"An user with email '{user_update.email}' already exists.")
     
+    previous_username = user.username
     for key, value in user_update.dict(exclude_unset=True).items():
         setattr(user, key, value)
 
     try:
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise Exception(e)
 
+    # El nombre aparece en los pedidos del usuario: se invalidan el ámbito anterior y el nuevo
+    await bump_data_version(previous_username, user.username)
     return user
 
 async def delete_user(
     id: int, 
-    db: Session = Depends(get_db_session), 
+    db: AsyncSession = Depends(get_db_session), 
     current_user: dict = Depends()
 ):
     query = select(User).where(User.id == id)
-    user = db.exec(query).first()
+    user = (await db.exec(query)).first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -118,16 +147,18 @@ async def delete_user(
     if current_user["role"] in ["customer", "viewer"] and current_user["sub"] != user.username:
         raise HTTPException(status_code=403, detail="Insufficient permissions to delete other users")
     
-    orders = await read_order(None, id, None, None, 0, 1, db, current_user)
-        
-    if len(orders) > 0:
+    # EXISTS sobre ix_order_user_id_created_at_id: sin leer ni enriquecer los pedidos
+    has_orders = (await db.execute(select(exists().where(Order.user_id == id)))).scalar()
+
+    if has_orders:
         raise HTTPException(status_code=409, detail="User cannot be deleted due to has associated orders")
     
     try:    
-        db.delete(user)
-        db.commit()
+        await db.delete(user)
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise Exception(e)
 
+    await bump_data_version(user.username)
     return {"detail": "User deleted successfully"}
\ No newline at end of file
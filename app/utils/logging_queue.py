@@ -0,0 +1,60 @@
+import logging
+import os
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+
+# (listener, QueueHandler que escribe en su cola)
+_listeners = []
+# Handlers originales de cada logger, para restaurarlos al parar
+_original_handlers = {}
+
+def install_queue_logging(*logger_names: str):
+    # Sustituye los handlers configurados (fichero, consola) por un QueueHandler;
+    # un hilo QueueListener hace la escritura real fuera del event loop
+    by_handlers = {}
+    for name in ("",) + logger_names:
+        logger = logging.getLogger(name)
+        handlers = tuple(h for h in logger.handlers if not isinstance(h, QueueHandler))
+        if not handlers:
+            continue
+        if handlers not in by_handlers:
+            queue = SimpleQueue()
+            listener = QueueListener(queue, *handlers, respect_handler_level=True)
+            listener.start()
+            by_handlers[handlers] = QueueHandler(queue)
+            _listeners.append((listener, by_handlers[handlers]))
+        _original_handlers[name] = list(logger.handlers)
+        logger.handlers = [by_handlers[handlers]]
+
+def stop_queue_logging():
+    # Vacía las colas y devuelve a cada logger sus handlers: lo que se registre después se escribe directamente
+    while _listeners:
+        listener, _ = _listeners.pop()
+        listener.stop()
+    for name, handlers in _original_handlers.items():
+        logging.getLogger(name).handlers = handlers
+    _original_handlers.clear()
+
+def _restarted(listener: QueueListener, queue) -> QueueListener:
+    restarted = QueueListener(queue, *listener.handlers, respect_handler_level=listener.respect_handler_level)
+    restarted.start()
+    return restarted
+
+def _stop_before_fork():
+    # server.py precarga la app en el padre: antes de cada fork se paran los hilos para que el hijo no
+    # herede una cola a medio leer (registros duplicados) ni el lock interno de la cola tomado
+    for listener, _ in _listeners:
+        listener.stop()
+
+def _restart_in_parent():
+    for index, (listener, handler) in enumerate(_listeners):
+        _listeners[index] = (_restarted(listener, listener.queue), handler)
+
+def _restart_in_child():
+    # Cada worker escribe en una cola nueva con su propio hilo
+    for index, (listener, handler) in enumerate(_listeners):
+        handler.queue = SimpleQueue()
+        _listeners[index] = (_restarted(listener, handler.queue), handler)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_stop_before_fork, after_in_parent=_restart_in_parent, after_in_child=_restart_in_child)
@@ -0,0 +1,298 @@
+import asyncio
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+from app.utils.processes import process_alive, process_key
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: pid_alive no detecta workers muertos, así que no hay nada que plegar
+    fcntl = None
+
+load_dotenv()
+
+# Métricas en formato de texto de Prometheus. Cada proceso acumula las suyas en memoria (sin
+# coordinación entre workers) y las vuelca periódicamente a un fichero propio; /metrics suma los
+# ficheros de todos los workers del mismo arranque
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "online_shop_metrics"))
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+# server.py fija METRICS_RUN_ID antes de crear los workers; sin él cada proceso es su propio arranque
+METRICS_RUN_ID = os.getenv("METRICS_RUN_ID") or str(os.getpid())
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "http_request_duration_seconds": "HTTP request latency by route",
+    "http_requests_in_progress": "HTTP requests currently being served",
+    "db_statements_total": "SQL statements executed",
+    "db_statement_duration_seconds": "SQL statement latency",
+    "redis_command_duration_seconds": "Redis command latency",
+    "cache_requests_total": "Cache lookups by result",
+    "revocation_checks_total": "Token revocation checks by result",
+    "upstream_request_duration_seconds": "Upstream HTTP call latency",
+    "upstream_errors_total": "Upstream HTTP call errors",
+    "bcrypt_duration_seconds": "bcrypt hash/verify time",
+    "export_render_duration_seconds": "Export render time by format",
+}
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+class MetricsRegistry:
+    # Un lock sin contención entre procesos: solo lo comparten el event loop y los hilos del propio worker
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name: str, labels: dict = None, value: float = 1):
+        if not METRICS_ENABLED:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge_add(self, name: str, labels: dict = None, value: float = 1):
+        if not METRICS_ENABLED:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: dict = None, buckets: tuple = LATENCY_BUCKETS):
+        if not METRICS_ENABLED:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["counts"][index] += 1
+                    break
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str, labels: dict = None, buckets: tuple = LATENCY_BUCKETS):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels, buckets)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "key": process_key(),
+                "counters": [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                "gauges": [[name, list(labels), value] for (name, labels), value in self.gauges.items()],
+                "histograms": [
+                    [name, list(labels), list(h["buckets"]), list(h["counts"]), h["sum"], h["count"]]
+                    for (name, labels), h in self.histograms.items()
+                ]
+            }
+
+metrics = MetricsRegistry()
+
+def _reset_after_fork():
+    # Los workers creados con fork no heredan lo que hubiera medido el proceso padre
+    metrics.__init__()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _snapshot_path(key: str) -> str:
+    return os.path.join(METRICS_DIR, f"{METRICS_RUN_ID}-{key}.json")
+
+def _dead_path() -> str:
+    # Contadores e histogramas acumulados de los workers ya terminados de este arranque
+    return os.path.join(METRICS_DIR, f"{METRICS_RUN_ID}-dead.json")
+
+def _snapshot_alive(snapshot: dict) -> bool:
+    # El acumulado de los workers terminados no tiene pid; un pid reutilizado tiene otro arranque
+    return snapshot.get("pid") is not None and process_alive(snapshot.get("key") or "")
+
+def _write_json(path: str, data: dict):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+def flush_metrics():
+    if METRICS_RUN_ID == str(os.getpid()):
+        # Proceso único: /metrics se sirve desde memoria
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    snapshot = metrics.snapshot()
+    _write_json(_snapshot_path(snapshot["key"]), snapshot)
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def reset_metrics_dir():
+    # Lo llama server.py al arrancar: descarta los ficheros de arranques anteriores
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(METRICS_DIR, "*")):
+        if not os.path.basename(path).startswith(f"{METRICS_RUN_ID}-"):
+            _remove(path)
+
+def _read_snapshots() -> dict:
+    snapshots = {}
+    for path in glob.glob(os.path.join(METRICS_DIR, f"{METRICS_RUN_ID}-*.json")):
+        try:
+            with open(path) as file:
+                snapshots[path] = json.load(file)
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+def _load_snapshots() -> list:
+    # Un fichero ya sumado al acumulado puede seguir existiendo un instante (o tras un fallo a mitad
+    # del plegado): se ignora para no contarlo dos veces
+    snapshots = _read_snapshots()
+    dead = snapshots.get(_dead_path(), {})
+    folded = set(dead.get("folded", []))
+    return [snapshot for snapshot in snapshots.values() if snapshot.get("key") not in folded]
+
+def fold_dead_snapshots():
+    # Suma los ficheros de los workers terminados al acumulado y los borra, para que el directorio no
+    # crezca con cada reciclado. Sus gauges se descartan (solo cuentan los workers vivos)
+    if fcntl is None or METRICS_RUN_ID == str(os.getpid()):
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(os.path.join(METRICS_DIR, f"{METRICS_RUN_ID}-fold.lock"), "w") as lock:
+        # Un solo worker pliega a la vez: el acumulado se lee, se modifica y se reescribe
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshots = _read_snapshots()
+        dead_path = _dead_path()
+        previous = snapshots.pop(dead_path, None)
+        folded = set(previous.get("folded", [])) if previous else set()
+        for path in [path for path, snapshot in snapshots.items() if snapshot.get("key") in folded]:
+            # Ya sumados en un plegado anterior que no llegó a borrarlos
+            _remove(path)
+            del snapshots[path]
+
+        dead = {path: snapshot for path, snapshot in snapshots.items() if not _snapshot_alive(snapshot)}
+        if not dead:
+            return
+        merged = merge(([previous] if previous else []) + list(dead.values()))
+        _write_json(dead_path, {
+            "pid": None,
+            "key": "dead",
+            "folded": [snapshot.get("key") for snapshot in dead.values()],
+            "counters": [[name, list(labels), value] for (name, labels), value in merged["counters"].items()],
+            "gauges": [],
+            "histograms": [
+                [name, list(labels), h["buckets"], h["counts"], h["sum"], h["count"]]
+                for (name, labels), h in merged["histograms"].items()
+            ]
+        })
+        for path in dead:
+            _remove(path)
+
+def collect() -> list:
+    if METRICS_RUN_ID == str(os.getpid()):
+        return [metrics.snapshot()]
+    flush_metrics()
+    return _load_snapshots()
+
+def merge(snapshots: list) -> dict:
+    # Contadores e histogramas se suman (también los de workers ya reciclados, para que no decrezcan);
+    # los gauges solo cuentan los workers vivos
+    counters, gauges, histograms = {}, {}, {}
+    for snapshot in snapshots:
+        alive = _snapshot_alive(snapshot)
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        if alive:
+            for name, labels, value in snapshot["gauges"]:
+                key = (name, tuple(tuple(label) for label in labels))
+                gauges[key] = gauges.get(key, 0) + value
+        for name, labels, buckets, counts, total, count in snapshot["histograms"]:
+            key = (name, tuple(tuple(label) for label in labels))
+            merged = histograms.setdefault(key, {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0})
+            merged["counts"] = [a + b for a, b in zip(merged["counts"], counts)]
+            merged["sum"] += total
+            merged["count"] += count
+    return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+def _format_labels(labels, extra: tuple = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for key, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+def render(merged: dict) -> str:
+    lines = []
+    declared = set()
+
+    def declare(name: str, kind: str):
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(merged["counters"].items()):
+        declare(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), value in sorted(merged["gauges"].items()):
+        declare(name, "gauge")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), histogram in sorted(merged["histograms"].items()):
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(histogram["buckets"], histogram["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+def render_metrics() -> str:
+    return render(merge(collect()))
+
+_flush_task = None
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            flush_metrics()
+            fold_dead_snapshots()
+        except OSError as e:
+            print(f"Metrics flush error: {e}")
+
+async def start_metrics():
+    global _flush_task
+    if METRICS_ENABLED and _flush_task is None and METRICS_RUN_ID != str(os.getpid()):
+        _flush_task = asyncio.create_task(_flush_loop())
+
+async def stop_metrics():
+    global _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+        _flush_task = None
+        flush_metrics()
@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+# Cursores opacos para paginación keyset ordenada por (created_at, id)
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(query, created_at_column, id_column, skip: int, limit: int, cursor: str = None):
+    # Pide una fila de más para saber si existe una página siguiente sin hacer un COUNT
+    query = query.order_by(created_at_column, id_column)
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        # Comparación de filas (created_at, id) > (x, y): el planificador la resuelve como un rango sobre el
+        # índice (created_at, id); con OR recorre el índice completo
+        query = query.where(tuple_(created_at_column, id_column) > tuple_(created_at, id))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+def split_page(rows, limit: int, created_at_of, id_of):
+    # Devuelve (filas de la página, cursor siguiente o None)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(created_at_of(last), id_of(last))
@@ -0,0 +1,125 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader
+from pypdf import PdfWriter
+from xhtml2pdf import pisa
+
+load_dotenv()
+
+def pdf_worker_count(workers: int, web_workers: int) -> int:
+    # 0: cada worker web tiene su propio pool, así que los núcleos se reparten entre ellos
+    # (con un núcleo por worker web y pool se tendrían cpu² procesos de renderizado)
+    return workers if workers > 0 else max(1, (os.cpu_count() or 1) // max(web_workers, 1))
+
+# server.py fija WEB_WORKER_PROCESSES con el número de workers web antes de importar la aplicación
+PDF_WORKERS = pdf_worker_count(int(os.getenv("PDF_WORKERS", "0")), int(os.getenv("WEB_WORKER_PROCESSES", "1")))
+PDF_PAGE_BATCH_SIZE = int(os.getenv("PDF_PAGE_BATCH_SIZE", "500"))
+# El PDF se construye entero en memoria: por encima de este número de pedidos se responde 413
+PDF_MAX_ORDERS = int(os.getenv("PDF_MAX_ORDERS", "5000"))
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+TEMPLATE_NAME = "pdf_template_orders.html"
+
+# Plantilla compilada una sola vez por proceso del pool
+_template = None
+
+def _init_worker():
+    global _template
+    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), auto_reload=False)
+    _template = env.get_template(TEMPLATE_NAME)
+
+def _render_batch(customer_name, orders, grand_total):
+    # grand_total es None en todos los lotes salvo el último, que es el que lleva el pie con el total
+    if _template is None:
+        _init_worker()
+    start = time.perf_counter()
+    html_content = _template.render(customer_name=customer_name, orders=orders, grand_total=grand_total)
+    buffer = BytesIO()
+    pisa_status = pisa.CreatePDF(html_content, dest=buffer)
+    if pisa_status.err:
+        raise ValueError("Error al generar el PDF")
+    return buffer.getvalue(), time.perf_counter() - start
+
+def _merge(parts):
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(BytesIO(part))
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+class PdfEngine:
+    # Renderiza los PDF en un pool de procesos (xhtml2pdf es Python puro y retiene el GIL);
+    # los listados grandes se dividen en lotes de páginas que se renderizan en paralelo y se unen
+    def __init__(self, workers: int = PDF_WORKERS, batch_size: int = PDF_PAGE_BATCH_SIZE):
+        self.workers = workers
+        self.batch_size = batch_size
+        self._executor = None
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.batches = 0
+        self.render_time_total = 0.0
+        self.render_time_max = 0.0
+        self.batch_time_total = 0.0
+        self.last_render_time = None
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+        return self._executor
+
+    def stop(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def render(self, customer_name, data) -> bytes:
+        executor = self._executor or self.start()
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        grand_total = sum(item['price'] * item['quantity'] for item in data)
+        chunks = [data[i:i + self.batch_size] for i in range(0, len(data), self.batch_size)] or [[]]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, _render_batch, customer_name, chunk, grand_total if index == len(chunks) - 1 else None)
+            for index, chunk in enumerate(chunks)
+        ))
+        parts = [content for content, _ in results]
+        content = parts[0] if len(parts) == 1 else await loop.run_in_executor(executor, _merge, parts)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.renders += 1
+            self.batches += len(chunks)
+            self.render_time_total += elapsed
+            self.render_time_max = max(self.render_time_max, elapsed)
+            self.batch_time_total += sum(batch_time for _, batch_time in results)
+            self.last_render_time = elapsed
+        return content
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "batch_size": self.batch_size,
+                "renders": self.renders,
+                "batches": self.batches,
+                "render_time_total": round(self.render_time_total, 6),
+                "render_time_max": round(self.render_time_max, 6),
+                "render_time_avg": round(self.render_time_total / self.renders, 6) if self.renders else None,
+                "batch_time_total": round(self.batch_time_total, 6),
+                "last_render_time": round(self.last_render_time, 6) if self.last_render_time is not None else None
+            }
+
+pdf_engine = PdfEngine()
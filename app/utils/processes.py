@@ -0,0 +1,54 @@
+import os
+import time
+
+# Identidad de un proceso que sobrevive a la reutilización de su pid: "<pid>-<arranque>". La usan los
+# ficheros de métricas de cada worker y los trabajos de exportación para saber si su proceso sigue vivo
+_key = None
+
+def process_start(pid: int):
+    # Momento de arranque del proceso según el kernel (campo 22 de /proc/<pid>/stat); None sin /proc
+    # o si el proceso ya no existe
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            stat = file.read()
+    except OSError:
+        return None
+    return stat[stat.rindex(")") + 2:].split()[19]
+
+def process_key() -> str:
+    global _key
+    if _key is None:
+        _key = f"{os.getpid()}-{process_start(os.getpid()) or time.time_ns()}"
+    return _key
+
+def _reset_after_fork():
+    global _key
+    _key = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # En Windows os.kill(pid, 0) terminaría el proceso
+        return True
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+
+def process_alive(key: str) -> bool:
+    pid, _, start = key.partition("-")
+    if not pid.isdigit():
+        return False
+    pid = int(pid)
+    if pid == os.getpid():
+        return key == process_key()
+    current = process_start(pid)
+    if current is not None:
+        # El pid existe: solo es el mismo proceso si arrancó en el mismo momento
+        return current == start
+    return pid_alive(pid)
@@ -0,0 +1,36 @@
+"""Plugin de pytest con la fixture `query_budget`.
+
+Se activa desde un conftest.py con `pytest_plugins = ["app.utils.query_budget"]`:
+
+    def test_list_orders(client, admin_headers, query_budget):
+        with query_budget(sql=3, http=0, n_plus_one=0):
+            client.get("/orders/?limit=50", headers=admin_headers)
+
+Al salir del bloque falla si se supera algún presupuesto (None: sin límite) y muestra las consultas agrupadas.
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from app.utils.query_inspector import QUERY_INSPECTOR_N_PLUS_ONE, capture
+
+@contextmanager
+def _budget(sql: int = None, redis: int = None, http: int = None, n_plus_one: int = 0, threshold: int = QUERY_INSPECTOR_N_PLUS_ONE):
+    with capture() as report:
+        yield report
+
+    counts = report.counts()
+    problems = [
+        f"{kind}: {counts[kind]} > {limit}"
+        for kind, limit in (("sql", sql), ("redis", redis), ("http", http))
+        if limit is not None and counts[kind] > limit
+    ]
+    repeated = report.n_plus_one(threshold)
+    if n_plus_one is not None and len(repeated) > n_plus_one:
+        problems.append(f"N+1 patterns: {len(repeated)} > {n_plus_one}")
+    if problems:
+        pytest.fail("Query budget exceeded (" + "; ".join(problems) + ")\n" + report.format(), pytrace=False)
+
+@pytest.fixture
+def query_budget():
+    return _budget
@@ -0,0 +1,143 @@
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Inspector de consultas (solo desarrollo/CI): registra cada sentencia SQL, comando de Redis y llamada
+# HTTP saliente de una petición, agrupa las formas repetidas y marca los patrones N+1
+QUERY_INSPECTOR_ENABLED = os.getenv("QUERY_INSPECTOR_ENABLED", "false").lower() == "true"
+# Una misma forma repetida al menos este número de veces en una petición se considera N+1
+QUERY_INSPECTOR_N_PLUS_ONE = int(os.getenv("QUERY_INSPECTOR_N_PLUS_ONE", "5"))
+QUERY_INSPECTOR_HISTORY = int(os.getenv("QUERY_INSPECTOR_HISTORY", "200"))
+
+KINDS = ("sql", "redis", "http")
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+|\d+(?:\.\d+)?|'[^']*')"
+_VALUE_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_REPEATED_LISTS = re.compile(r"\(…\)(?:\s*,\s*\(…\))+")
+_LITERAL = re.compile(r"\b\d+\b|'[^']*'")
+_IDENTIFIER = re.compile(r"[0-9a-fA-F]{8,}(?:-[0-9a-fA-F]{4,})*|\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    # Misma forma para la misma consulta con distintos parámetros, listas IN o filas de VALUES
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _VALUE_LIST.sub("(…)", shape)
+    shape = _REPEATED_LISTS.sub("(…)", shape)
+    return _LITERAL.sub("?", shape)
+
+@lru_cache(maxsize=1024)
+def key_shape(value: str) -> str:
+    # Claves de Redis y rutas HTTP: los identificadores numéricos o hexadecimales se sustituyen por ?
+    return _IDENTIFIER.sub("?", value)
+
+class QueryReport:
+    def __init__(self, method: str = "", path: str = ""):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started = time.perf_counter()
+        self.duration = None
+        self.events = []
+
+    def add(self, kind: str, operation: str, duration: float):
+        self.events.append((kind, operation, duration))
+
+    def finish(self, status: int = None):
+        self.status = status
+        self.duration = time.perf_counter() - self.started
+
+    def counts(self) -> dict:
+        counts = dict.fromkeys(KINDS, 0)
+        for kind, _, _ in self.events:
+            counts[kind] += 1
+        return counts
+
+    def groups(self) -> list:
+        groups = {}
+        for kind, operation, duration in self.events:
+            shape = statement_shape(operation) if kind == "sql" else key_shape(operation)
+            group = groups.setdefault((kind, shape), {"kind": kind, "shape": shape, "count": 0, "total_ms": 0.0})
+            group["count"] += 1
+            group["total_ms"] += duration * 1000
+        for group in groups.values():
+            group["total_ms"] = round(group["total_ms"], 3)
+        return sorted(groups.values(), key=lambda group: (-group["count"], -group["total_ms"]))
+
+    def n_plus_one(self, threshold: int = None) -> list:
+        threshold = threshold or QUERY_INSPECTOR_N_PLUS_ONE
+        return [group for group in self.groups() if group["count"] >= threshold]
+
+    def summary(self, detailed: bool = True) -> dict:
+        groups = self.groups()
+        summary = {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "counts": self.counts(),
+            "n_plus_one": [group for group in groups if group["count"] >= QUERY_INSPECTOR_N_PLUS_ONE]
+        }
+        if detailed:
+            summary["groups"] = groups
+        return summary
+
+    def header(self) -> str:
+        return " ".join(f"{kind}={count}" for kind, count in self.counts().items())
+
+    def format(self) -> str:
+        lines = [self.header()]
+        for group in self.groups():
+            lines.append(f"  {group['count']:>4}x {group['kind']:<5} {group['total_ms']:>9.3f}ms  {group['shape']}")
+        return "\n".join(lines)
+
+_current: ContextVar = ContextVar("query_report", default=None)
+# Informes abiertos con capture() (p. ej. la fixture query_budget): reciben todo lo del proceso
+_captures = []
+_history = OrderedDict()
+
+def record(kind: str, operation: str, duration: float):
+    # Lo llaman los hooks de SQL, Redis y HTTP; sin informe activo solo cuesta un ContextVar.get()
+    report = _current.get()
+    if report is not None:
+        report.add(kind, operation, duration)
+    for captured in _captures:
+        captured.add(kind, operation, duration)
+
+def start_report(method: str, path: str) -> tuple:
+    report = QueryReport(method, path)
+    return report, _current.set(report)
+
+def end_report(report: QueryReport, token, status: int = None):
+    _current.reset(token)
+    report.finish(status)
+    _history[report.id] = report
+    while len(_history) > QUERY_INSPECTOR_HISTORY:
+        _history.popitem(last=False)
+
+def recent_reports() -> list:
+    return [report.summary(detailed=False) for report in reversed(_history.values())]
+
+def get_report(report_id: str):
+    return _history.get(report_id)
+
+@contextmanager
+def capture():
+    # Recoge todo lo que ocurre en el proceso mientras está abierto, en cualquier hilo o event loop
+    report = QueryReport()
+    _captures.append(report)
+    try:
+        yield report
+    finally:
+        _captures.remove(report)
+        report.finish()
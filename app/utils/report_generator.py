@@ -1,69 +1,149 @@
-from io import BytesIO
-from fastapi import Response
-from fastapi.responses import StreamingResponse
-import pandas as pd
-from jinja2 import Environment, FileSystemLoader
-from xhtml2pdf import pisa
-
-def generate_excel(customer_name, data):
+import csv
+import os
+import tempfile
+from io import BytesIO, StringIO
+from fastapi import HTTPException, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+import xlsxwriter
+
+from app.utils.metrics import SLOW_BUCKETS, metrics
+from app.utils.pdf_engine import PDF_MAX_ORDERS, pdf_engine
+
+async def peek_batch(batches):
+    # Devuelve el primer lote para poder responder con error si no hay datos antes de empezar el streaming
+    async for batch in batches:
+        if batch:
+            return batch
+    return None
+
+async def _chain(first, batches):
+    yield first
+    async for batch in batches:
+        yield batch
+
+async def csv_chunks(first, batches):
+    # Genera el CSV de forma incremental: una cabecera y un bloque de bytes por lote
+    # El tiempo medido incluye la lectura de los lotes: es lo que tarda en generarse el fichero completo
+    with metrics.timer("export_render_duration_seconds", {"format": "csv"}, SLOW_BUCKETS):
+        columns = list(first[0].keys())
+        buffer = StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        async for batch in _chain(first, batches):
+            writer.writerows([row[column] for column in columns] for row in batch)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+def _write_excel_rows(worksheet, start_row, columns, batch, date_format):
+    for offset, row in enumerate(batch):
+        for column_index, column in enumerate(columns):
+            value = row[column]
+            if hasattr(value, "isoformat"):
+                worksheet.write_datetime(start_row + offset, column_index, value, date_format)
+            else:
+                worksheet.write(start_row + offset, column_index, value)
+
+async def write_excel(path, first, batches):
+    # constant_memory: xlsxwriter vuelca cada fila a disco, la memoria no crece con el número de pedidos
+    with metrics.timer("export_render_duration_seconds", {"format": "excel"}, SLOW_BUCKETS):
+        await _write_excel_workbook(path, first, batches)
+
+async def _write_excel_workbook(path, first, batches):
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
     try:
-        if not data:
+        worksheet = workbook.add_worksheet("Orders")
+        header_format = workbook.add_format({"bold": True, "border": 1})
+        date_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        columns = list(first[0].keys())
+        worksheet.write_row(0, 0, columns, header_format)
+        row_number = 1
+        async for batch in _chain(first, batches):
+            await run_in_threadpool(_write_excel_rows, worksheet, row_number, columns, batch, date_format)
+            row_number += len(batch)
+    finally:
+        await run_in_threadpool(workbook.close)
+
+async def write_csv(path, first, batches):
+    with open(path, "wb") as file:
+        async for chunk in csv_chunks(first, batches):
+            await run_in_threadpool(file.write, chunk)
+
+async def generate_excel(customer_name, batches):
+    try:
+        first = await peek_batch(batches)
+        if not first:
             return {"error": "No hay datos para generar el Excel"}
-        
-        buffer = BytesIO()
-        df = pd.DataFrame(data)
-        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-            df.to_excel(writer, index=False, sheet_name="Orders")
-        buffer.seek(0)
-        
-        return StreamingResponse(
-            buffer,
+
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            await write_excel(path, first, batches)
+        except Exception:
+            os.remove(path)
+            raise
+
+        return FileResponse(
+            path,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={customer_name}_orders.xlsx"}
+            filename=f"{customer_name}_orders.xlsx",
+            background=BackgroundTask(os.remove, path)
         )
     except Exception as e:
         return {"error": str(e)}
 
 
-def generate_csv(customer_name, data):
+async def generate_csv(customer_name, batches):
     try:
-        if not data:
+        first = await peek_batch(batches)
+        if not first:
             return {"error": "No hay datos para generar el CSV"}
-        
-        # Generar el archivo CSV en memoria
-        buffer = BytesIO()
-        df = pd.DataFrame(data)
-        df.to_csv(buffer, index=False)
-        buffer.seek(0)
-        # Enviar el archivo CSV al cliente
+
+        # Enviar el archivo CSV al cliente a medida que se leen los lotes
         return StreamingResponse(
-            buffer,
+            csv_chunks(first, batches),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename={customer_name}_orders.csv"}
         )
     except Exception as e:
         return {"error": str(e)}
 
-def generate_pdf(customer_name, data):
+def pdf_limit(limit):
+    # Se lee un pedido más del máximo para saber si la exportación lo supera sin contar antes
+    return min(limit, PDF_MAX_ORDERS + 1) if limit is not None else PDF_MAX_ORDERS + 1
+
+def check_pdf_size(orders: int):
+    if orders > PDF_MAX_ORDERS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"PDF exports are limited to {PDF_MAX_ORDERS} orders, use skip/limit or the CSV/Excel export"
+        )
+
+async def collect_pdf_orders(first, batches) -> list:
+    data = list(first)
+    check_pdf_size(len(data))
+    async for batch in batches:
+        data.extend(batch)
+        check_pdf_size(len(data))
+    return data
+
+async def render_pdf(customer_name, data) -> bytes:
+    with metrics.timer("export_render_duration_seconds", {"format": "pdf"}, SLOW_BUCKETS):
+        return await pdf_engine.render(customer_name, data)
+
+async def generate_pdf(customer_name, data):
     try:
         if not data:
             return {"error": "No hay datos para generar el PDF"}
-        
-        env = Environment(loader=FileSystemLoader("app/templates"))
-        template = env.get_template("pdf_template_orders.html")
-        grand_total = sum(item['price'] * item['quantity'] for item in data)
-        html_content = template.render(customer_name=customer_name, orders=data, grand_total=grand_total)
-
-        buffer = BytesIO()
-        pisa_status = pisa.CreatePDF(html_content, dest=buffer)
-        if pisa_status.err:
-            return {"error": "Error al generar el PDF"}
-        buffer.seek(0)
-        
+
+        buffer = BytesIO(await render_pdf(customer_name, data))
+
         return StreamingResponse(
             buffer,
             media_type="application/pdf",
             headers={"Content-Disposition": f"attachment; filename={customer_name}_orders.pdf"}
         )
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
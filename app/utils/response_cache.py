@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.db.redis_client import redis_client
+from app.services.data_version import ALL_CUSTOMERS, get_data_version
+from app.utils.serialization import dump_list
+
+load_dotenv()
+
+# Caché de respuestas de los listados GET. La clave incluye la versión de datos del ámbito del
+# usuario, así que una escritura invalida sus entradas sin borrarlas (caducan por TTL)
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+# Sin Redis la versión de datos es un contador de cada proceso: una escritura atendida por otro worker
+# no invalida las entradas de este. El LRU en memoria solo se usa si se activa (un único proceso)
+RESPONSE_CACHE_LOCAL = os.getenv("RESPONSE_CACHE_LOCAL", "false").lower() == "true"
+RESPONSE_CACHE_PREFIX = "response:"
+
+class ResponseCache:
+    # Redis cuando está disponible (compartido entre workers); si no, y solo con RESPONSE_CACHE_LOCAL,
+    # un LRU en memoria cuyas entradas también caducan a los `ttl` segundos
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS, local: bool = RESPONSE_CACHE_LOCAL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.local = local
+        self._local = OrderedDict()
+
+    async def get(self, key: str) -> Optional[dict]:
+        if redis_client:
+            try:
+                entry = await redis_client.get(f"{RESPONSE_CACHE_PREFIX}{key}")
+                return json.loads(entry) if entry else None
+            except Exception as e:
+                print(f"Redis error: {e}")
+                return None
+        if not self.local:
+            return None
+        cached = self._local.get(key)
+        if cached is None:
+            return None
+        expires_at, entry = cached
+        if expires_at <= time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: dict):
+        if redis_client:
+            try:
+                await redis_client.setex(f"{RESPONSE_CACHE_PREFIX}{key}", self.ttl, json.dumps(entry))
+            except Exception as e:
+                print(f"Redis error: {e}")
+            return
+        if not self.local:
+            return
+        self._local[key] = (time.monotonic() + self.ttl, entry)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+response_cache = ResponseCache()
+
+def cache_scope(current_user: dict) -> str:
+    # Un cliente solo ve sus propios datos; el resto de roles ve los de todos
+    return current_user["sub"] if current_user["role"] in ["customer"] else ALL_CUSTOMERS
+
+def response_cache_key(request: Request, current_user: dict, version: int) -> str:
+    # Parámetros normalizados: orden estable y sin valores vacíos
+    params = sorted((name, value) for name, value in request.query_params.multi_items() if value != "")
+    raw = json.dumps([request.url.path, params, current_user["role"], current_user["sub"], version])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+async def cached_response(request: Request, current_user: dict, adapter: TypeAdapter, build) -> Response:
+    # `build` devuelve (elementos ya construidos, cabeceras); sus excepciones (404...) no se cachean
+    version = await get_data_version(cache_scope(current_user))
+    key = response_cache_key(request, current_user, version)
+    entry = await response_cache.get(key)
+
+    if entry is None:
+        items, headers = await build()
+        body = dump_list(adapter, items).decode("utf-8")
+        entry = {
+            "body": body,
+            "etag": f'"{hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]}"',
+            "headers": headers
+        }
+        await response_cache.set(key, entry)
+
+    headers = {**entry["headers"], "ETag": entry["etag"], "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
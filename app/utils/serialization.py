@@ -0,0 +1,19 @@
+from typing import List
+from pydantic import TypeAdapter
+
+from app.models.order import OrderRead
+from app.models.user import UserRead
+
+# Serializadores precompilados de los listados. Los elementos ya los construye la capa de servicio
+# a partir de la base de datos, así que se vuelcan a JSON directamente, sin volver a validarlos
+ORDER_LIST_ADAPTER = TypeAdapter(List[OrderRead])
+USER_LIST_ADAPTER = TypeAdapter(List[UserRead])
+
+_USER_READ_FIELDS = tuple(UserRead.model_fields)
+
+def user_reads(users) -> List[UserRead]:
+    # De User (tabla) a UserRead sin validar: solo se copian los campos públicos (nunca hashed_password)
+    return [UserRead.model_construct(**{field: getattr(user, field) for field in _USER_READ_FIELDS}) for user in users]
+
+def dump_list(adapter: TypeAdapter, items) -> bytes:
+    return adapter.dump_json(items)
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import math
+import random
+import time
+from collections import OrderedDict
+from functools import partial
+
+from app.db.redis_client import redis_client
+from app.utils.metrics import metrics
+
+class TwoTierCache:
+    # LRU en memoria del proceso delante de Redis (opcional). Cada entrada guarda hasta cuándo es
+    # fresca; pasado ese momento se sigue sirviendo durante `stale_ttl` mientras se refresca en
+    # segundo plano. Los fallos concurrentes de una misma clave comparten una única carga (single-flight)
+    def __init__(self, prefix: str, ttl: int, stale_ttl: int = 0, jitter: float = 0.0, local_size: int = 1024):
+        self.prefix = prefix
+        self.name = prefix.rstrip(":")
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.jitter = jitter
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._inflight = {}
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _new_entry(self, value) -> dict:
+        # Jitter: las claves cargadas a la vez no caducan todas en el mismo instante
+        ttl = self.ttl * (1 + random.uniform(-self.jitter, self.jitter))
+        return {"value": value, "fresh_until": time.time() + ttl}
+
+    def _store_local(self, key: str, entry: dict):
+        if self.local_size <= 0:
+            return
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def _lookup(self, keys: list, now: float) -> dict:
+        entries = {}
+        remote = []
+        for key in keys:
+            entry = self._local.get(key)
+            if entry is not None and now < entry["fresh_until"] + self.stale_ttl:
+                self._local.move_to_end(key)
+                entries[key] = entry
+                self.local_hits += 1
+                metrics.inc("cache_requests_total", {"cache": self.name, "result": "local_hit"})
+            else:
+                self._local.pop(key, None)
+                remote.append(key)
+
+        if redis_client and remote:
+            try:
+                cached = await redis_client.mget([f"{self.prefix}{key}" for key in remote])
+                for key, raw in zip(remote, cached):
+                    if raw:
+                        entry = json.loads(raw)
+                        self._store_local(key, entry)
+                        entries[key] = entry
+                        self.redis_hits += 1
+                        metrics.inc("cache_requests_total", {"cache": self.name, "result": "redis_hit"})
+            except Exception as e:
+                print(f"Redis error: {e}")
+        return entries
+
+    async def _store(self, values: dict):
+        entries = {key: self._new_entry(value) for key, value in values.items()}
+        for key, entry in entries.items():
+            self._store_local(key, entry)
+        if redis_client and entries:
+            try:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for key, entry in entries.items():
+                        expire = math.ceil(entry["fresh_until"] - time.time() + self.stale_ttl)
+                        pipe.setex(f"{self.prefix}{key}", max(expire, 1), json.dumps(entry))
+                    await pipe.execute()
+            except Exception as e:
+                print(f"Redis error: {e}")
+
+    async def _load_and_store(self, keys: list, loader_many) -> dict:
+        self.loads += 1
+        values = await loader_many(keys)
+        # Los valores None (p. ej. producto inexistente) no se cachean
+        await self._store({key: value for key, value in values.items() if value is not None})
+        return values
+
+    def _load_done(self, keys: list, task: asyncio.Task):
+        for key in keys:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Cache load error: {task.exception()}")
+
+    def _start_load(self, keys: list, loader_many) -> dict:
+        # Reutiliza la carga en curso de cada clave; solo las demás se cargan en una tarea nueva
+        pending = [key for key in keys if key not in self._inflight]
+        if pending:
+            task = asyncio.create_task(self._load_and_store(pending, loader_many))
+            for key in pending:
+                self._inflight[key] = task
+            task.add_done_callback(partial(self._load_done, pending))
+        return {key: self._inflight[key] for key in keys}
+
+    async def get_many_or_load(self, keys: list, loader_many) -> dict:
+        # `loader_many(claves)` devuelve {clave: valor}; el resultado omite las claves sin valor
+        now = time.time()
+        entries = await self._lookup(keys, now)
+        results = {}
+        stale = []
+        missing = []
+        for key in keys:
+            entry = entries.get(key)
+            if entry is None:
+                missing.append(key)
+                continue
+            results[key] = entry["value"]
+            if now >= entry["fresh_until"]:
+                stale.append(key)
+
+        if stale:
+            self.stale_hits += len(stale)
+            metrics.inc("cache_requests_total", {"cache": self.name, "result": "stale"}, len(stale))
+            self._start_load(stale, loader_many)
+
+        if missing:
+            self.misses += len(missing)
+            metrics.inc("cache_requests_total", {"cache": self.name, "result": "miss"}, len(missing))
+            loaded = {}
+            # shield: si se cancela esta petición, la carga sigue para el resto de esperas
+            for task in set(self._start_load(missing, loader_many).values()):
+                try:
+                    loaded.update(await asyncio.shield(task))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Cache load error: {e}")
+            for key in missing:
+                if loaded.get(key) is not None:
+                    results[key] = loaded[key]
+        return results
+
+    async def get_or_load(self, key: str, loader):
+        async def load_one(keys):
+            return {key: await loader()}
+
+        return (await self.get_many_or_load([key], load_one)).get(key)
+
+    def stats(self) -> dict:
+        return {
+            "local_size": len(self._local),
+            "local_max_size": self.local_size,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "inflight": len(self._inflight)
+        }
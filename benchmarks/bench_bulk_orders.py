@@ -0,0 +1,49 @@
+"""Creación de pedidos uno a uno (POST /orders/) frente a la creación masiva (POST /orders/bulk).
+
+Uso: python -m benchmarks.bench_bulk_orders --items 10000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import ADMIN, PRODUCTS, seed_customer, setup_database
+from app.db.database import dispose_engines, session_scope
+from app.models.order import OrderCreate
+from app.services.order import create_order, create_orders_bulk
+
+def order_items(username: str, count: int):
+    return [
+        OrderCreate(customer_username=username, product=f"Product {i % PRODUCTS + 1}", quantity=i % 5 + 1)
+        for i in range(count)
+    ]
+
+async def per_item(items) -> float:
+    start = time.perf_counter()
+    async with session_scope() as db:
+        for item in items:
+            await create_order(item, db, ADMIN)
+    return time.perf_counter() - start
+
+async def bulk(items) -> float:
+    start = time.perf_counter()
+    async with session_scope() as db:
+        created, errors = await create_orders_bulk(items, db, ADMIN)
+    assert len(created) == len(items) and not errors
+    return time.perf_counter() - start
+
+async def run(count: int):
+    setup_database()
+    seed_customer("customer_bulk", 0)
+    items = order_items("customer_bulk", count)
+
+    print(f"{'mode':>10} {'items':>8} {'seconds':>9} {'items/s':>10}")
+    for mode, call in (("per_item", per_item), ("bulk", bulk)):
+        seconds = await call(items)
+        print(f"{mode:>10} {count:>8} {seconds:>9.2f} {count / seconds:>10.0f}")
+    await dispose_engines()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.items))
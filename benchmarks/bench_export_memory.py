@@ -0,0 +1,54 @@
+"""Memoria pico de las exportaciones CSV/Excel en streaming según el número de pedidos.
+
+Uso: python -m benchmarks.bench_export_memory --sizes 1000,10000,100000,1000000
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+from benchmarks.common import ADMIN, WORKDIR, seed_customer, setup_database
+from app.db.database import dispose_engines
+from app.services.order import iter_order_batches
+from app.utils.report_generator import csv_chunks, peek_batch, write_excel
+
+async def measure_csv(username: str):
+    total = 0
+    batches = iter_order_batches(username, ADMIN)
+    first = await peek_batch(batches)
+    async for chunk in csv_chunks(first, batches):
+        total += len(chunk)
+    return total
+
+async def measure_excel(username: str):
+    path = os.path.join(WORKDIR, f"{username}.xlsx")
+    batches = iter_order_batches(username, ADMIN)
+    first = await peek_batch(batches)
+    await write_excel(path, first, batches)
+    size = os.path.getsize(path)
+    os.remove(path)
+    return size
+
+async def run(sizes):
+    setup_database()
+
+    print(f"{'orders':>10} {'format':>6} {'output':>12} {'peak_kib':>10} {'seconds':>8}")
+    for size in sizes:
+        username = f"customer_{size}"
+        seed_customer(username, size)
+        for name, measure in (("csv", measure_csv), ("xlsx", measure_excel)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            output = await measure(username)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{size:>10} {name:>6} {output:>12} {peak // 1024:>10} {elapsed:>8.2f}")
+    await dispose_engines()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Número de pedidos por cliente, separados por comas")
+    args = parser.parse_args()
+    asyncio.run(run([int(size) for size in args.sizes.split(",")]))
@@ -0,0 +1,55 @@
+"""Latencia por página de /orders/ con OFFSET frente a cursor keyset según la profundidad.
+
+Uso: python -m benchmarks.bench_pagination --orders 1000000 --depths 0,1000,100000,900000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import select
+
+from benchmarks.common import ADMIN, seed_customer, setup_database
+from app.db.database import dispose_engines, session_scope
+from app.models.order import Order
+from app.services.order import read_order_page
+from app.utils.pagination import encode_cursor
+
+async def cursor_at(db, depth: int):
+    # Cursor equivalente a haber recorrido `depth` filas (preparación, no se cronometra)
+    if depth == 0:
+        return None
+    row = (await db.execute(
+        select(Order.created_at, Order.id).order_by(Order.created_at, Order.id).offset(depth - 1).limit(1)
+    )).first()
+    return encode_cursor(row[0], row[1])
+
+async def timed(repeat: int, call):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+async def run(orders: int, depths, limit: int, repeat: int):
+    setup_database()
+    seed_customer("customer_pagination", orders)
+
+    print(f"{'depth':>10} {'offset_ms':>10} {'cursor_ms':>10}")
+    async with session_scope() as db:
+        for depth in depths:
+            cursor = await cursor_at(db, depth)
+            offset_ms = await timed(repeat, lambda: read_order_page(skip=depth, limit=limit, db=db, current_user=ADMIN))
+            cursor_ms = await timed(repeat, lambda: read_order_page(limit=limit, db=db, current_user=ADMIN, cursor=cursor))
+            print(f"{depth:>10} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+    await dispose_engines()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--depths", default="0,1000,10000,100000,500000,900000")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.orders, [int(depth) for depth in args.depths.split(",")], args.limit, args.repeat))
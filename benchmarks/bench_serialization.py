@@ -0,0 +1,63 @@
+"""Serialización de 10k pedidos: camino anterior (validación + response_model + json) frente al nuevo (TypeAdapter).
+
+Uso: python -m benchmarks.bench_serialization --orders 10000
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+# benchmarks.common fija el entorno de los benchmarks: se importa antes que app
+from benchmarks.common import PRODUCTS
+from app.models.order import OrderRead
+from app.utils.serialization import ORDER_LIST_ADAPTER, dump_list
+
+RESPONSE_MODEL_ADAPTER = TypeAdapter(List[OrderRead])
+
+def rows(count: int):
+    start = datetime(2024, 1, 1)
+    return [(i, f"Product {i % PRODUCTS}", float(i % PRODUCTS), i % 5 + 1, "customer", start + timedelta(seconds=i)) for i in range(count)]
+
+def previous_path(data) -> bytes:
+    # El servicio construía OrderRead validando, FastAPI revalidaba contra response_model
+    # y JSONResponse codificaba con json.dumps
+    orders = [
+        OrderRead(id=row[0], product=row[1], price=row[2], quantity=row[3], customer_username=row[4], created_at=row[5])
+        for row in data
+    ]
+    content = RESPONSE_MODEL_ADAPTER.dump_python(RESPONSE_MODEL_ADAPTER.validate_python(orders), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def new_path(data) -> bytes:
+    orders = [
+        OrderRead.model_construct(id=row[0], product=row[1], price=row[2], quantity=row[3], customer_username=row[4], created_at=row[5])
+        for row in data
+    ]
+    return dump_list(ORDER_LIST_ADAPTER, orders)
+
+def timed(repeat: int, call, data) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call(data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def run(count: int, repeat: int):
+    data = rows(count)
+    assert json.loads(previous_path(data)) == json.loads(new_path(data))
+
+    print(f"{'path':>10} {'orders':>8} {'ms':>9}")
+    for name, call in (("previous", previous_path), ("new", new_path)):
+        print(f"{name:>10} {count:>8} {timed(repeat, call, data):>9.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.orders, args.repeat)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Entorno local para los benchmarks: SQLite (aiosqlite), sin Redis ni DummyJSON.
+# Debe importarse antes que cualquier módulo de `app`
+WORKDIR = tempfile.mkdtemp(prefix="online_shop_bench_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR}/bench.db")
+os.environ.setdefault("DB_ASYNC", "true")
+os.environ.setdefault("IN_DOCKER", "false")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("REFRESH_SECRET_KEY", "bench-refresh-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_DAYS", "7")
+os.environ.setdefault("REVOKED_TOKENS_FILE", os.path.join(WORKDIR, "revoked_tokens.txt"))
+os.environ.setdefault("REPORTS_DIR", os.path.join(WORKDIR, "reports"))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.clients.product_catalog import catalog  # noqa: E402
+from app.db.database import engine  # noqa: E402
+from app.db.migrate import upgrade  # noqa: E402
+from app.models.order import Order  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+PRODUCTS = 100
+ADMIN = {"sub": "bench_admin", "role": "admin"}
+
+def fake_products(count: int = PRODUCTS):
+    return [{"id": i, "title": f"Product {i}", "price": float(i), "stock": 10} for i in range(1, count + 1)]
+
+def setup_database():
+    # Mismo esquema e índices que producción
+    upgrade()
+    catalog.load(fake_products())
+
+def seed_customer(username: str, orders: int, hashed_password: str = "x", role: str = "customer") -> int:
+    start = datetime.utcnow()
+    with engine.begin() as conn:
+        user_id = conn.execute(
+            insert(User).values(username=username, email=f"{username}@example.com", hashed_password=hashed_password, role=role, created_at=start).returning(User.id)
+        ).scalar_one()
+        chunk = 50_000
+        for offset in range(0, orders, chunk):
+            conn.execute(insert(Order), [
+                {
+                    "user_id": user_id,
+                    "product_id": i % PRODUCTS + 1,
+                    "product_title": f"Product {i % PRODUCTS + 1}",
+                    "unit_price": float(i % PRODUCTS + 1),
+                    "quantity": i % 5 + 1,
+                    "created_at": start + timedelta(microseconds=i)
+                }
+                for i in range(offset, min(offset + chunk, orders))
+            ])
+    return user_id
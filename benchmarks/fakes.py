@@ -0,0 +1,158 @@
+"""Dobles locales para los benchmarks: Redis en memoria y un DummyJSON simulado con httpx.MockTransport."""
+import asyncio
+import fnmatch
+import time
+
+import httpx
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def __getattr__(self, name):
+        # Encola cualquier comando soportado por FakeRedis (incr, setex, set, get...)
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        results = [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+        self.channels = set()
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self.channels.add(channel)
+            self.redis._subscribers.setdefault(channel, set()).add(self.queue)
+            # Como Redis, confirma cada suscripción con un mensaje "subscribe"
+            self.queue.put_nowait(("subscribe", channel, len(self.channels)))
+
+    async def listen(self):
+        while True:
+            message_type, channel, data = await self.queue.get()
+            yield {"type": message_type, "channel": channel, "data": data}
+
+    async def reset(self):
+        for channel in self.channels:
+            self.redis._subscribers.get(channel, set()).discard(self.queue)
+        self.channels = set()
+
+class FakeRedis:
+    # Subconjunto de redis.asyncio.Redis (decode_responses=True) que usa la aplicación
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._subscribers = {}
+        self.commands = 0
+
+    def _alive(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    async def ping(self):
+        self.commands += 1
+        return True
+
+    async def close(self):
+        pass
+
+    async def get(self, key: str):
+        self.commands += 1
+        return self._data[key] if self._alive(key) else None
+
+    async def mget(self, keys):
+        self.commands += 1
+        return [self._data[key] if self._alive(key) else None for key in keys]
+
+    async def set(self, key: str, value, ex: int = None):
+        self.commands += 1
+        self._data[key] = str(value)
+        if ex is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = time.time() + ex
+        return True
+
+    async def setex(self, key: str, ttl: int, value):
+        return await self.set(key, value, ex=ttl)
+
+    async def incr(self, key: str) -> int:
+        self.commands += 1
+        value = int(self._data[key]) + 1 if self._alive(key) else 1
+        self._data[key] = str(value)
+        return value
+
+    async def exists(self, *keys) -> int:
+        self.commands += 1
+        return sum(1 for key in keys if self._alive(key))
+
+    async def ttl(self, key: str) -> int:
+        self.commands += 1
+        if not self._alive(key):
+            return -2
+        expires = self._expires.get(key)
+        return -1 if expires is None else int(expires - time.time())
+
+    async def scan_iter(self, match: str = "*", count: int = None):
+        for key in list(self._data):
+            if self._alive(key) and fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def publish(self, channel: str, message) -> int:
+        self.commands += 1
+        subscribers = self._subscribers.get(channel, set())
+        for queue in subscribers:
+            queue.put_nowait(("message", channel, str(message)))
+        return len(subscribers)
+
+    def pipeline(self, transaction: bool = True):
+        return FakePipeline(self)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+def dummyjson_transport(products: list, latency: float = 0.0) -> httpx.MockTransport:
+    # Responde /products, /products/search y /products/{id} con el mismo formato que DummyJSON
+    by_id = {product["id"]: product for product in products}
+
+    def page(items, params):
+        skip = int(params.get("skip", 0))
+        limit = int(params.get("limit", 30))
+        selected = items[skip:skip + limit] if limit else items[skip:]
+        return {"products": selected, "total": len(items), "skip": skip, "limit": limit}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        path = request.url.path.rstrip("/")
+        params = request.url.params
+        if path == "/products":
+            return httpx.Response(200, json=page(products, params))
+        if path == "/products/search":
+            query = params.get("q", "").casefold()
+            return httpx.Response(200, json=page([p for p in products if query in p["title"].casefold()], params))
+        if path.startswith("/products/"):
+            product_id = path.rsplit("/", 1)[1]
+            if product_id.isdigit() and int(product_id) in by_id:
+                return httpx.Response(200, json=by_id[int(product_id)])
+            return httpx.Response(404, json={"message": f"Product with id '{product_id}' not found"})
+        return httpx.Response(404, json={"message": "Not found"})
+
+    return httpx.MockTransport(handler)
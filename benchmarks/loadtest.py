@@ -0,0 +1,239 @@
+"""Prueba de carga de todos los routers contra SQLite (o Postgres), Redis en memoria y DummyJSON simulado.
+
+Uso:
+  python -m benchmarks.loadtest run --customers 20 --orders 20000 --concurrency 16 --requests 300 --output current.json
+  python -m benchmarks.loadtest compare baseline.json current.json --threshold 0.15
+
+Con DATABASE_URL se puede apuntar a un Postgres local. `compare` termina con código 1 si detecta regresiones.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+PASSWORD = "loadtest-password"
+
+def percentile(samples: list, percent: float) -> float:
+    # Rango más cercano sobre las muestras ordenadas
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss: KB en Linux, bytes en macOS; se incluyen los procesos hijo (p. ej. el pool de PDF)
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(rss, children) / scale, 1)
+
+def scenarios(customers: list, products: int):
+    # (nombre, rol, función (i, usuario) -> (método, url, kwargs)); se espera siempre un 2xx
+    def login(i, user):
+        return "POST", "/api/auth/login", {"data": {"username": customers[i % len(customers)], "password": PASSWORD}}
+
+    def create_order(i, user):
+        body = {"customer_username": user, "product": f"Product {i % products + 1}", "quantity": i % 5 + 1}
+        return "POST", "/orders/", {"json": body}
+
+    return [
+        ("auth.login", "customer", login),
+        ("users.list.admin", "admin", lambda i, user: ("GET", f"/users/?limit=20&skip={i % 5 * 20}", {})),
+        ("users.list.customer", "customer", lambda i, user: ("GET", "/users/", {})),
+        ("orders.list.admin", "admin", lambda i, user: ("GET", f"/orders/?limit=50&skip={i % 20 * 50}", {})),
+        ("orders.list.customer", "customer", lambda i, user: ("GET", f"/orders/?limit=50&username={user}", {})),
+        ("orders.create", "customer", create_order),
+        ("orders.stats.products", "admin", lambda i, user: ("GET", "/orders/stats/products?limit=10", {})),
+        ("orders.stats.periods", "admin", lambda i, user: ("GET", "/orders/stats/periods?granularity=week", {})),
+        ("products.list", "customer", lambda i, user: ("GET", f"/products/?limit=20&skip={i % 5 * 20}", {})),
+        ("products.by_name", "customer", lambda i, user: ("GET", f"/products/Product {i % products + 1}", {})),
+        ("products.search", "customer", lambda i, user: ("GET", f"/products/search?q=product {i % 9 + 1}", {})),
+        ("exports.csv", "customer", lambda i, user: ("GET", f"/orders/{user}/csv", {})),
+        ("exports.excel", "customer", lambda i, user: ("GET", f"/orders/{user}/excel?limit=1000", {})),
+        ("exports.pdf", "customer", lambda i, user: ("GET", f"/orders/{user}/pdf?limit=200", {})),
+    ]
+
+async def drive(client, requests: int, concurrency: int, make_request, users: list, tokens: dict):
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            user = users[i % len(users)]
+            method, url, kwargs = make_request(i, user)
+            headers = {"Authorization": f"Bearer {tokens[user]}"}
+            start = time.perf_counter()
+            response = await client.request(method, url, headers=headers, **kwargs)
+            await response.aread()
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 300:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+async def run(args) -> dict:
+    # Entorno antes de importar la aplicación: sin logging por petición y bcrypt con el coste indicado
+    os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+    os.environ.setdefault("BCRYPT_ROUNDS", str(args.bcrypt_rounds))
+    from benchmarks.common import PRODUCTS, fake_products, seed_customer, setup_database
+    from benchmarks.fakes import FakeRedis, dummyjson_transport
+
+    # El Redis falso debe instalarse antes de importar los módulos que hacen `from ... import redis_client`
+    import app.db.redis_client
+    fake_redis = FakeRedis() if args.redis == "fake" else None
+    app.db.redis_client.redis_client = fake_redis
+
+    import httpx
+    from sqlalchemy import event
+    from app.auth.hashing import hash_password
+    from app.clients.http_client import init_http_client
+    from app.db.database import DB_ASYNC, async_engine, engine
+    from main import app as application
+
+    setup_database()
+    hashed = hash_password(PASSWORD)
+    seed_customer("loadtest_admin", 0, hashed_password=hashed, role="admin")
+    customers = [f"loadtest_customer_{n}" for n in range(args.customers)]
+    for username in customers:
+        seed_customer(username, args.orders // max(args.customers, 1), hashed_password=hashed)
+
+    queries = 0
+
+    def count_query(*_):
+        nonlocal queries
+        queries += 1
+
+    target_engine = async_engine.sync_engine if DB_ASYNC else engine
+    event.listen(target_engine, "before_cursor_execute", count_query)
+
+    await init_http_client(transport=dummyjson_transport(fake_products(PRODUCTS), args.upstream_latency))
+    selected = set(args.scenarios.split(",")) if args.scenarios else None
+    results = {}
+    async with application.router.lifespan_context(application):
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            tokens = {}
+            for username in ["loadtest_admin"] + customers:
+                response = await client.post("/api/auth/login", data={"username": username, "password": PASSWORD})
+                tokens[username] = response.json()["access_token"]
+
+            print(f"{'scenario':<22} {'req':>6} {'err':>5} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'rps':>8} {'q/req':>6}")
+            for name, role, make_request in scenarios(customers, PRODUCTS):
+                if selected and name not in selected:
+                    continue
+                users = ["loadtest_admin"] if role == "admin" else customers
+                queries = 0
+                latencies, errors, elapsed = await drive(client, args.requests, args.concurrency, make_request, users, tokens)
+                results[name] = {
+                    "requests": len(latencies),
+                    "errors": errors,
+                    "p50_ms": round(percentile(latencies, 50), 3),
+                    "p95_ms": round(percentile(latencies, 95), 3),
+                    "p99_ms": round(percentile(latencies, 99), 3),
+                    "throughput_rps": round(len(latencies) / elapsed, 2),
+                    "queries_per_request": round(queries / max(len(latencies), 1), 3)
+                }
+                r = results[name]
+                print(f"{name:<22} {r['requests']:>6} {r['errors']:>5} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['throughput_rps']:>8.1f} {r['queries_per_request']:>6.2f}")
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": target_engine.dialect.name,
+            "redis": args.redis,
+            "customers": args.customers,
+            "orders": args.orders,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "upstream_latency": args.upstream_latency
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "redis_commands": fake_redis.commands if fake_redis else 0,
+        "scenarios": results
+    }
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    # Regresión: p95 o p99 sube, el throughput baja más del umbral, o aumentan los errores o las consultas por petición
+    regressions = []
+    print(f"{'scenario':<22} {'p95 base':>9} {'p95 now':>9} {'rps base':>9} {'rps now':>9} {'q/req':>11}  status")
+    for name, base in baseline["scenarios"].items():
+        now = current["scenarios"].get(name)
+        if now is None:
+            continue
+        problems = []
+        for metric in ("p95_ms", "p99_ms"):
+            if base[metric] > 0 and now[metric] > base[metric] * (1 + threshold):
+                problems.append(f"{metric} +{(now[metric] / base[metric] - 1) * 100:.0f}%")
+        if base["throughput_rps"] > 0 and now["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            problems.append(f"throughput -{(1 - now['throughput_rps'] / base['throughput_rps']) * 100:.0f}%")
+        if now["queries_per_request"] > base["queries_per_request"] + 0.01:
+            problems.append(f"queries {base['queries_per_request']} -> {now['queries_per_request']}")
+        if now["errors"] > base["errors"]:
+            problems.append(f"errors {base['errors']} -> {now['errors']}")
+
+        status = "REGRESSION: " + ", ".join(problems) if problems else "ok"
+        queries = f"{base['queries_per_request']}->{now['queries_per_request']}"
+        print(f"{name:<22} {base['p95_ms']:>9.2f} {now['p95_ms']:>9.2f} {base['throughput_rps']:>9.1f} {now['throughput_rps']:>9.1f} {queries:>11}  {status}")
+        if problems:
+            regressions.append((name, problems))
+
+    if baseline.get("peak_rss_mb") and current.get("peak_rss_mb"):
+        print(f"peak RSS: {baseline['peak_rss_mb']} MB -> {current['peak_rss_mb']} MB")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the load test and print/save the results")
+    run_parser.add_argument("--customers", type=int, default=20)
+    run_parser.add_argument("--orders", type=int, default=20_000, help="Total orders, split across the customers")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--requests", type=int, default=300, help="Requests per scenario")
+    run_parser.add_argument("--scenarios", default="", help="Comma-separated subset (default: all)")
+    run_parser.add_argument("--redis", choices=["fake", "none"], default="fake")
+    run_parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    run_parser.add_argument("--upstream-latency", type=float, default=0.0, help="Simulated DummyJSON latency in seconds")
+    run_parser.add_argument("--output", help="Write the results as a JSON baseline")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files and flag regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative change (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        result = asyncio.run(run(args))
+        print(f"peak RSS: {result['peak_rss_mb']} MB")
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(result, file, indent=2)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    regressions = compare(baseline, current, args.threshold)
+    print(f"{len(regressions)} scenarios regressed" if regressions else "No regressions")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,44 +1,71 @@
 import os
-import time
 import logging
 import logging.config
-from starlette.concurrency import iterate_in_threadpool
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from app.routes import order, product, user, auth
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.auth.hashing import shutdown_hashing_pool
+from app.auth.revocation import revocations
+from app.clients.http_client import close_http_client, init_http_client
+from app.clients.product_catalog import catalog
+from app.db.database import dispose_engines
+from app.db.redis_client import close_redis, init_redis
+from app.db.migrate import migrate_on_startup
+from app.services.report_jobs import start_report_workers, stop_report_workers
+from app.utils.logging_queue import install_queue_logging, stop_queue_logging
+from app.utils.metrics import start_metrics, stop_metrics
+from app.utils.query_inspector import QUERY_INSPECTOR_ENABLED
+from app.utils.pdf_engine import pdf_engine
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.query_inspector import QueryInspectorMiddleware
+from app.middleware.request_logging import RequestLoggingMiddleware
+from app.routes import order, product, user, auth, internal, metrics
 
 # Configurar logging
 config_path = os.path.join(os.path.dirname(__file__), 'logging.conf')
 logging.config.fileConfig(config_path)
+install_queue_logging("app")
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Online Shop API")
-
-# Middleware para registrar cada solicitud y respuesta
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    body = await request.body()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Se ejecuta en cada worker: cada proceso abre y cierra sus propios pools (DB, Redis, HTTP)
+    logger.info("Application startup")
+    await migrate_on_startup()
+    await init_redis()
+    await init_http_client()
+    await catalog.start()
+    await revocations.start()
+    await start_report_workers()
+    pdf_engine.start()
+    await start_metrics()
+    try:
+        yield
+    finally:
+        logger.info("Application shutdown")
+        await stop_metrics()
+        await stop_report_workers()
+        pdf_engine.stop()
+        await revocations.stop()
+        await catalog.stop()
+        await close_http_client()
+        await close_redis()
+        await dispose_engines()
+        shutdown_hashing_pool()
+        stop_queue_logging()
 
-    res_body = [section async for section in response.body_iterator]
-    response.body_iterator = iterate_in_threadpool(iter(res_body))
+# ORJSONResponse: codificación JSON más rápida para todas las respuestas por defecto
+app = FastAPI(title="Online Shop API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
-    content_type = response.headers.get("content-type", "")
-    if content_type.startswith("application/json") or content_type.startswith("text"):
-        try:
-            decoded_body = res_body[0].decode("utf-8")
-        except UnicodeDecodeError:
-            decoded_body = "<binary content>"
-    else:
-        decoded_body = "<binary content>"
+# Middleware para registrar cada solicitud y respuesta (muestreado y sin bufferizar)
+app.add_middleware(RequestLoggingMiddleware)
 
-    logger.info(f"{request.method} {request.url.path} - {response.status_code} - {process_time:.2f}s")
-    logger.info(f"Request: {request.method} {request.url} Body: {body.decode('utf-8', errors='ignore') if body else 'No Body'}")
-    logger.info(f"Response: {decoded_body}")
+# Métricas Prometheus por ruta (expuestas en /metrics)
+app.add_middleware(MetricsMiddleware)
 
-    return response
+# Inspector de consultas por petición y detección de N+1 (solo desarrollo/CI)
+if QUERY_INSPECTOR_ENABLED:
+    app.add_middleware(QueryInspectorMiddleware)
 
 # Manejo de excepciones
 @app.exception_handler(Exception)
@@ -49,14 +76,6 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"Online Shop API": "An error occurred"},
     )
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Application startup")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Application shutdown")
-    
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Online Shop API!"}
@@ -66,7 +85,10 @@ app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(order.router)
 app.include_router(product.router)
+app.include_router(internal.router)
+app.include_router(metrics.router)
 
+# Desarrollo (un proceso con recarga automática); en producción se usa server.py
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -1,17 +1,24 @@
+import asyncio
 from datetime import date, datetime
 from sqlmodel import Session
 from app.auth.hashing import hash_password
 from app.models.order import Order
 from app.models.user import User
-from app.db.database import create_db_and_tables, drop_db_and_tables, engine
+from app.db.database import drop_db_and_tables, engine
+from app.db.migrate import backfill, upgrade
+from app.services.sales_stats import run_rebuild
 
 def seed_data():
     # Borrar la base de datos y las tablas existentes
     drop_db_and_tables() 
-    # Crear la base de datos y las tablas
-    create_db_and_tables()
+    # Crear las tablas e índices aplicando las migraciones
+    upgrade()
     # Insertar los datos falsos
     insert_fake_data()
+    # Copiar título y precio de DummyJSON en los pedidos insertados
+    backfill()
+    # Calcular los agregados de ventas de los pedidos insertados
+    rebuild_sales_stats()
 
 # Función para insertar datos falsos
 def insert_fake_data():
@@ -38,5 +45,11 @@ def insert_fake_data():
         except Exception as e:
             print(f"Error creating Orders: {e}")
 
+def rebuild_sales_stats():
+    try:
+        asyncio.run(run_rebuild())
+    except Exception as e:
+        print(f"Error rebuilding sales summary: {e}")
+
 if __name__ == "__main__":
     seed_data()
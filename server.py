@@ -0,0 +1,180 @@
+"""Lanzador de producción: varios workers uvicorn con la aplicación precargada.
+
+El proceso padre importa `main:app` una sola vez, abre el socket y crea los workers con fork
+(comparten el código ya importado y el socket). Cada worker ejecuta el lifespan de la aplicación,
+así que abre y cierra sus propios pools de base de datos, Redis y HTTP. El padre vuelve a crear
+los workers que terminan (p. ej. al alcanzar WEB_MAX_REQUESTS) y, con SIGTERM/SIGINT, los detiene
+de forma ordenada.
+
+Uso: python server.py [--workers N] [--host 0.0.0.0] [--port 8000]
+"""
+import argparse
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from dotenv import load_dotenv
+import uvicorn
+
+load_dotenv()
+
+logger = logging.getLogger("app.server")
+
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "8000"))
+# 0: un worker por CPU
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0"))
+# Reciclado de workers tras N peticiones (0 lo desactiva); el jitter evita que reinicien todos a la vez
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "0"))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))
+WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", "2048"))
+
+# Un worker que muere antes de este tiempo se considera un fallo de arranque: se espera antes de recrearlo
+MIN_WORKER_UPTIME = 1.0
+
+def worker_count(workers: int) -> int:
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+def uvicorn_options(max_requests: int) -> dict:
+    # loop/http "auto": uvloop y httptools si están instalados, asyncio y h11 si no
+    limit = max_requests + random.randint(0, WEB_MAX_REQUESTS_JITTER) if max_requests > 0 else None
+    return {
+        "loop": "auto",
+        "http": "auto",
+        "lifespan": "on",
+        "limit_max_requests": limit,
+        "timeout_keep_alive": WEB_KEEPALIVE,
+        "timeout_graceful_shutdown": WEB_GRACEFUL_TIMEOUT,
+        "backlog": WEB_BACKLOG,
+        # El logging lo configura main.py (logging.conf); el acceso ya lo registra el middleware
+        "log_config": None,
+        "access_log": False,
+    }
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(WEB_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+class Supervisor:
+    def __init__(self, app, sock: socket.socket, workers: int, max_requests: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.max_requests = max_requests
+        self.children = {}
+        self.stopping = False
+
+    def _run_worker(self):
+        # Proceso hijo: uvicorn instala sus propios manejadores de SIGTERM/SIGINT (parada ordenada)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGALRM):
+            signal.signal(signum, signal.SIG_DFL)
+        code = 0
+        try:
+            config = uvicorn.Config(self.app, **uvicorn_options(self.max_requests))
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException as e:
+            logger.error(f"Worker {os.getpid()} crashed: {e}")
+            code = 1
+        finally:
+            logging.shutdown()
+            os._exit(code)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.children[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+
+    def _handle_exit(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"Received signal {signum}, stopping {len(self.children)} workers")
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGTERM)
+        # Si algún worker no termina a tiempo se fuerza su salida
+        signal.alarm(WEB_GRACEFUL_TIMEOUT + 5)
+
+    def _handle_alarm(self, signum, frame):
+        for pid in list(self.children):
+            logger.warning(f"Worker {pid} did not stop in time, killing it")
+            self._signal(pid, signal.SIGKILL)
+
+    def _signal(self, pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGALRM, self._handle_alarm)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            # Reciclado por WEB_MAX_REQUESTS o caída: se sustituye el worker
+            logger.info(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                time.sleep(MIN_WORKER_UPTIME)
+            self.spawn()
+
+        signal.alarm(0)
+        self.sock.close()
+        logger.info("All workers stopped")
+        return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=WEB_HOST)
+    parser.add_argument("--port", type=int, default=WEB_PORT)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="0: one worker per CPU")
+    parser.add_argument("--max-requests", type=int, default=WEB_MAX_REQUESTS, help="Recycle a worker after N requests (0: never)")
+    args = parser.parse_args(argv)
+    workers = worker_count(args.workers)
+
+    # Todos los workers de este arranque comparten METRICS_RUN_ID: /metrics suma sus ficheros
+    os.environ["METRICS_RUN_ID"] = str(os.getpid())
+    # El pool de PDF de cada worker reparte los núcleos entre los workers (PDF_WORKERS=0)
+    os.environ["WEB_WORKER_PROCESSES"] = str(workers)
+
+    if not hasattr(os, "fork"):
+        # Sin fork (Windows): uvicorn gestiona los workers, cada uno importa la aplicación por su cuenta
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=workers, **uvicorn_options(args.max_requests))
+        return 0
+
+    # Precarga: la aplicación se importa una vez en el padre y los workers la heredan con fork
+    from main import app
+    from app.utils.metrics import reset_metrics_dir
+    from app.utils.logging_queue import stop_queue_logging
+    from app.utils.pdf_engine import PDF_WORKERS
+
+    reset_metrics_dir()
+    sock = bind_socket(args.host, args.port)
+    logger.info(f"Listening on {args.host}:{args.port} with {workers} workers, {PDF_WORKERS} PDF processes each")
+    try:
+        return Supervisor(app, sock, workers, args.max_requests).run()
+    finally:
+        stop_queue_logging()
+
+if __name__ == "__main__":
+    sys.exit(main())
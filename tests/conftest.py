@@ -0,0 +1,101 @@
+import os
+import tempfile
+
+# Entorno de las pruebas: SQLite (aiosqlite), sin Redis y sin acceso a DummyJSON.
+# Se fija antes de importar cualquier módulo de `app`; los subprocesos lo heredan
+WORKDIR = tempfile.mkdtemp(prefix="online_shop_tests_")
+# logging.conf escribe app.log en el directorio actual: que no acabe en el repositorio
+os.chdir(WORKDIR)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR}/tests.db")
+os.environ.setdefault("DB_ASYNC", "true")
+os.environ.setdefault("IN_DOCKER", "false")
+os.environ.setdefault("SECRET_KEY", "tests-secret")
+os.environ.setdefault("REFRESH_SECRET_KEY", "tests-refresh-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_DAYS", "7")
+os.environ.setdefault("REVOKED_TOKENS_FILE", os.path.join(WORKDIR, "revoked_tokens.txt"))
+os.environ.setdefault("REPORTS_DIR", os.path.join(WORKDIR, "reports"))
+os.environ.setdefault("METRICS_DIR", os.path.join(WORKDIR, "metrics"))
+os.environ.setdefault("DUMMYJSON_BASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+# Fixture query_budget (presupuesto de SQL, Redis y HTTP por bloque)
+pytest_plugins = ["app.utils.query_budget"]
+
+import time  # noqa: E402
+import uuid  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+
+import pytest  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+PRODUCTS = 20
+
+def fake_products(count: int = PRODUCTS):
+    return [{"id": i, "title": f"Product {i}", "price": float(i), "stock": 10} for i in range(1, count + 1)]
+
+@pytest.fixture(scope="session")
+def database():
+    # Mismo esquema que producción; el catálogo se carga en memoria (DummyJSON no es accesible)
+    from app.clients.product_catalog import catalog
+    from app.db.migrate import upgrade
+    upgrade()
+    catalog.load(fake_products())
+
+@pytest.fixture(scope="session")
+def client(database):
+    from fastapi.testclient import TestClient
+    from main import app
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def make_customer(database):
+    # Crea un usuario con `orders` pedidos (con la copia del producto) y devuelve (id, username)
+    from app.db.database import engine
+    from app.models.order import Order
+    from app.models.user import User
+
+    def make(orders: int = 0, role: str = "customer", created_at: datetime = None, step: timedelta = timedelta(seconds=1)):
+        username = f"{role}_{uuid.uuid4().hex[:8]}"
+        start = created_at or datetime.utcnow()
+        with engine.begin() as conn:
+            user_id = conn.execute(
+                insert(User).values(username=username, email=f"{username}@example.com", hashed_password="x", role=role, created_at=start).returning(User.id)
+            ).scalar_one()
+            if orders:
+                conn.execute(insert(Order), [
+                    {
+                        "user_id": user_id,
+                        "product_id": i % PRODUCTS + 1,
+                        "product_title": f"Product {i % PRODUCTS + 1}",
+                        "unit_price": float(i % PRODUCTS + 1),
+                        "quantity": i % 5 + 1,
+                        "created_at": start + step * i
+                    }
+                    for i in range(orders)
+                ])
+        return user_id, username
+    return make
+
+@pytest.fixture
+def auth_headers():
+    from app.auth.jwt import create_access_token
+
+    def headers(username: str, role: str = "customer") -> dict:
+        return {"Authorization": f"Bearer {create_access_token({'sub': username}, role=role)}"}
+    return headers
+
+@pytest.fixture
+def wait_job(client):
+    # Espera a que un trabajo de exportación termine (done o failed) y devuelve su estado
+    def wait(job_id: str, headers: dict) -> dict:
+        deadline = time.monotonic() + 30
+        while True:
+            job = client.get(f"/orders/exports/{job_id}", headers=headers).json()
+            if job["status"] in ("done", "failed"):
+                return job
+            assert time.monotonic() < deadline, job
+            time.sleep(0.05)
+    return wait
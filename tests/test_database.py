@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import database as database_module
+from app.db.database import ASYNC_DATABASE_URL, SyncSessionAdapter, engine_options, session_scope
+
+@pytest.fixture(params=[True, False], ids=["async", "sync"])
+def db_async(request, monkeypatch, database):
+    # Mismo SQLite en los dos modos: aiosqlite (AsyncSession) o Session síncrona en el threadpool
+    monkeypatch.setattr(database_module, "DB_ASYNC", request.param)
+    if request.param and database_module.async_engine is None:
+        monkeypatch.setattr(database_module, "async_engine", create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, True)))
+    return request.param
+
+def test_session_scope_follows_db_async(db_async):
+    async def scenario():
+        async with session_scope() as db:
+            return type(db), (await db.execute(text("SELECT 1"))).scalar()
+
+    session_type, value = asyncio.run(scenario())
+    assert session_type is (AsyncSession if db_async else SyncSessionAdapter)
+    assert value == 1
+
+def test_order_crud(db_async, client, make_customer, auth_headers):
+    _, username = make_customer()
+    headers = auth_headers(username)
+
+    created = client.post("/orders/", json={"customer_username": username, "product": "Product 3", "quantity": 2}, headers=headers)
+    assert created.status_code == 201
+    order = created.json()
+    assert (order["product"], order["price"], order["quantity"]) == ("Product 3", 3.0, 2)
+
+    listed = client.get("/orders/", headers=headers)
+    assert [item["id"] for item in listed.json()] == [order["id"]]
+
+    updated = client.put(f"/orders/{order['id']}", json={"quantity": 5}, headers=headers)
+    assert updated.status_code == 200
+    assert updated.json()["quantity"] == 5
+    assert client.get("/orders/", params={"id": order["id"]}, headers=headers).json()[0]["quantity"] == 5
+
+    assert client.delete(f"/orders/{order['id']}", headers=headers).status_code == 200
+    assert client.get("/orders/", headers=headers).status_code == 404
+    assert client.delete(f"/orders/{order['id']}", headers=headers).status_code == 404
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.utils import metrics as metrics_module
+from app.utils.processes import process_start
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/self/stat") or metrics_module.fcntl is None, reason="needs /proc and flock")
+
+def _snapshot(pid: int, key: str, requests: int, in_progress: int = 0) -> dict:
+    return {
+        "pid": pid,
+        "key": key,
+        "counters": [["requests_total", [["route", "/"]], requests]],
+        "gauges": [["in_progress", [], in_progress]],
+        "histograms": [["latency", [], [0.1, 1.0], [requests, 0], 0.05 * requests, requests]],
+    }
+
+def _write(directory, snapshot: dict):
+    (directory / f"run-{snapshot['key']}.json").write_text(json.dumps(snapshot))
+
+def _totals() -> tuple:
+    merged = metrics_module.merge(metrics_module._load_snapshots())
+    requests = merged["counters"].get(("requests_total", (("route", "/"),)), 0)
+    in_progress = merged["gauges"].get(("in_progress", ()), 0)
+    return requests, in_progress, merged["histograms"][("latency", ())]["count"]
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics_module, "METRICS_RUN_ID", "run")
+    return tmp_path
+
+def test_dead_and_reused_pid_workers_are_folded(metrics_dir):
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    live = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    try:
+        live_key = f"{live.pid}-{process_start(live.pid)}"
+        _write(metrics_dir, _snapshot(finished.pid, f"{finished.pid}-1", 2, in_progress=5))
+        # Mismo pid que este proceso pero otro arranque: un worker anterior cuyo pid se ha reutilizado
+        _write(metrics_dir, _snapshot(os.getpid(), f"{os.getpid()}-1", 3, in_progress=7))
+        _write(metrics_dir, _snapshot(live.pid, live_key, 4, in_progress=1))
+        assert _totals() == (9, 1, 9)
+
+        metrics_module.fold_dead_snapshots()
+        assert sorted(path.name for path in metrics_dir.glob("*.json")) == sorted(["run-dead.json", f"run-{live_key}.json"])
+        assert _totals() == (9, 1, 9)
+
+        live.kill()
+        live.wait()
+        metrics_module.fold_dead_snapshots()
+        assert [path.name for path in metrics_dir.glob("*.json")] == ["run-dead.json"]
+        assert _totals() == (9, 0, 9)
+    finally:
+        if live.poll() is None:
+            live.kill()
+            live.wait()
+
+def test_snapshot_left_behind_by_an_interrupted_fold_is_not_counted_twice(metrics_dir):
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    snapshot = _snapshot(finished.pid, f"{finished.pid}-1", 2)
+    _write(metrics_dir, snapshot)
+    metrics_module.fold_dead_snapshots()
+
+    # El fichero vuelve a aparecer (fallo entre la escritura del acumulado y el borrado)
+    _write(metrics_dir, snapshot)
+    assert _totals() == (2, 0, 2)
+    metrics_module.fold_dead_snapshots()
+    assert [path.name for path in metrics_dir.glob("*.json")] == ["run-dead.json"]
+    assert _totals() == (2, 0, 2)
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import httpx
+import sqlalchemy as sa
+
+from app.clients import http_client
+from app.db import migrate
+from app.db.migrations import m0004_order_product_snapshot
+
+def test_snapshot_upgrade_is_schema_only_and_backfill_fetches_outside_transactions(tmp_path, monkeypatch):
+    engine = sa.create_engine(f"sqlite:///{tmp_path}/migrations.db")
+    monkeypatch.setattr(migrate, "engine", engine)
+
+    # Transacción abierta en el momento de cada descarga del catálogo
+    state = {"open": False, "fetches": []}
+    sa.event.listen(engine, "begin", lambda conn: state.update(open=True))
+    sa.event.listen(engine, "commit", lambda conn: state.update(open=False))
+    sa.event.listen(engine, "rollback", lambda conn: state.update(open=False))
+
+    def fetch_catalog():
+        state["fetches"].append(state["open"])
+        return {1: {"id": 1, "title": "Product 1", "price": 1.5}}
+
+    monkeypatch.setattr(m0004_order_product_snapshot, "_fetch_catalog", fetch_catalog)
+
+    migrate.upgrade(3)
+    with engine.begin() as conn:
+        tables = sa.MetaData()
+        tables.reflect(conn, only=["user", "order"])
+        user_id = conn.execute(
+            tables.tables["user"].insert().values(username="old", email="old@example.com", hashed_password="x", role="customer", created_at=datetime(2024, 1, 1)).returning(tables.tables["user"].c.id)
+        ).scalar_one()
+        # Dos pedidos del mismo producto (un UPDATE executemany por producto) y uno que ya no está en el catálogo
+        conn.execute(tables.tables["order"].insert(), [
+            {"user_id": user_id, "product_id": product_id, "quantity": 2, "created_at": datetime(2024, 1, 1)}
+            for product_id in (1, 1, 2)
+        ])
+
+    assert migrate.upgrade() == [4]
+    assert state["fetches"] == []
+    with engine.connect() as conn:
+        assert conn.execute(sa.text('SELECT DISTINCT product_title, unit_price FROM "order"')).all() == [(None, None)]
+
+    assert migrate.backfill() == {4: 2}
+    assert state["fetches"] == [False]
+    with engine.connect() as conn:
+        assert conn.execute(sa.text('SELECT product_id, product_title, unit_price FROM "order" ORDER BY id')).all() == [
+            (1, "Product 1", 1.5), (1, "Product 1", 1.5), (2, None, None)
+        ]
+    engine.dispose()
+
+def test_snapshot_backfill_uses_the_http_client_settings(monkeypatch):
+    calls = []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"products": [{"id": 1, "title": "Product 1", "price": 1.5}]}
+
+    def get(url, **kwargs):
+        calls.append(kwargs)
+        return Response()
+
+    monkeypatch.setattr(m0004_order_product_snapshot, "HTTP_VERIFY_SSL", False)
+    monkeypatch.setattr(m0004_order_product_snapshot.httpx, "get", get)
+    assert m0004_order_product_snapshot._fetch_catalog() == {1: {"id": 1, "title": "Product 1", "price": 1.5}}
+    assert calls[0]["verify"] is False
+    assert calls[0]["timeout"] == httpx.Timeout(http_client.HTTP_READ_TIMEOUT, connect=http_client.HTTP_CONNECT_TIMEOUT)
+
+def test_hot_path_indexes_build_concurrently_outside_a_transaction(tmp_path, monkeypatch):
+    from sqlalchemy.dialects import postgresql
+    from app.db.migrations import m0002_hot_path_indexes
+
+    for index in m0002_hot_path_indexes.INDEXES:
+        assert str(sa.schema.CreateIndex(index).compile(dialect=postgresql.dialect())).strip().startswith("CREATE INDEX CONCURRENTLY")
+        assert str(sa.schema.DropIndex(index).compile(dialect=postgresql.dialect())).strip().startswith("DROP INDEX CONCURRENTLY")
+
+    engine = sa.create_engine(f"sqlite:///{tmp_path}/migrations.db")
+    monkeypatch.setattr(migrate, "engine", engine)
+    isolation = []
+    for step in ("upgrade", "downgrade"):
+        original = getattr(m0002_hot_path_indexes, step)
+        monkeypatch.setattr(m0002_hot_path_indexes, step, lambda conn, original=original: (isolation.append(conn.connection.dbapi_connection.isolation_level), original(conn)))
+
+    assert migrate.upgrade(2) == [1, 2]
+    assert migrate.downgrade(1) == [2]
+    # pysqlite en autocommit: isolation_level None (sin BEGIN implícito)
+    assert isolation == [None, None]
+    # La conexión vuelve a su nivel normal para las migraciones transaccionales siguientes
+    assert migrate.upgrade(3) == [2, 3]
+    with engine.connect() as conn:
+        assert "ix_order_created_at_id" in {index["name"] for index in sa.inspect(conn).get_indexes("order")}
+    engine.dispose()
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from app.db.database import engine
+from app.db.query_plans import _explain, hot_path_queries
+
+def test_cursor_pages_seek_the_created_at_index(database):
+    # (created_at, id) > (x, y): rango sobre el índice, no un recorrido completo
+    with engine.connect() as conn:
+        orders_plan = _explain(conn, hot_path_queries()["orders.list.admin.cursor"])
+        users_plan = _explain(conn, hot_path_queries()["users.list.cursor"])
+    assert any(line.startswith("SEARCH") and "ix_order_created_at_id (created_at>?)" in line for line in orders_plan), orders_plan
+    assert any(line.startswith("SEARCH") and "ix_user_created_at_id (created_at>?)" in line for line in users_plan), users_plan
+
+def test_cursor_walks_every_order_once_with_tied_timestamps(client, make_customer, auth_headers):
+    # Los pedidos con el mismo created_at se ordenan por id y ninguno se repite ni se pierde entre páginas
+    _, username = make_customer(orders=25, created_at=datetime(2030, 1, 1), step=timedelta(0))
+    headers = auth_headers(username)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/orders/", params=params, headers=headers)
+        assert response.status_code == 200
+        seen.extend(order["id"] for order in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == 25
+    assert seen == sorted(seen)
+
+def test_non_positive_limit_is_rejected(client, make_customer, auth_headers):
+    _, username = make_customer(orders=1)
+    headers = auth_headers(username)
+    for path in ("/orders/", "/users/"):
+        assert client.get(path, params={"limit": 0}, headers=headers).status_code == 422
+        assert client.get(path, params={"limit": -1}, headers=headers).status_code == 422
+        assert client.get(path, params={"skip": -1}, headers=headers).status_code == 422
@@ -0,0 +1,50 @@
+import pytest
+
+from app.services import report_jobs
+from app.utils import pdf_engine, report_generator
+
+@pytest.fixture
+def pdf_max_orders(monkeypatch):
+    monkeypatch.setattr(report_generator, "PDF_MAX_ORDERS", 3)
+
+@pytest.fixture
+def rendered(monkeypatch):
+    # Sin el pool de procesos: solo interesa cuántos pedidos llegan al renderizado
+    calls = []
+    async def fake_render(customer_name, data):
+        calls.append(len(data))
+        return b"%PDF-1.4"
+    monkeypatch.setattr(report_generator, "render_pdf", fake_render)
+    monkeypatch.setattr(report_jobs, "render_pdf", fake_render)
+    return calls
+
+def test_pdf_above_the_maximum_is_rejected(client, make_customer, auth_headers, pdf_max_orders, rendered):
+    _, username = make_customer(orders=4)
+    headers = auth_headers(username)
+
+    response = client.get(f"/orders/{username}/pdf", headers=headers)
+    assert response.status_code == 413
+    assert client.get(f"/orders/{username}/pdf", params={"limit": 10}, headers=headers).status_code == 413
+    assert client.post(f"/orders/{username}/exports", params={"format": "pdf"}, headers=headers).status_code == 413
+    assert rendered == []
+
+def test_pdf_within_the_maximum_is_rendered(client, make_customer, auth_headers, wait_job, pdf_max_orders, rendered):
+    _, username = make_customer(orders=4)
+    headers = auth_headers(username)
+
+    assert client.get(f"/orders/{username}/pdf", params={"limit": 3}, headers=headers).status_code == 200
+    assert client.get(f"/orders/{username}/pdf", params={"skip": 2}, headers=headers).status_code == 200
+    assert client.get(f"/orders/{username}/pdf", params={"limit": 0}, headers=headers).status_code == 422
+    assert rendered == [3, 2]
+
+    job = client.post(f"/orders/{username}/exports", params={"format": "pdf", "skip": 1}, headers=headers)
+    assert job.status_code == 202
+    assert wait_job(job.json()["job_id"], headers)["status"] == "done"
+    assert rendered == [3, 2, 3]
+
+def test_pdf_pool_splits_the_cores_between_web_workers(monkeypatch):
+    monkeypatch.setattr(pdf_engine.os, "cpu_count", lambda: 8)
+    assert pdf_engine.pdf_worker_count(0, 1) == 8
+    assert pdf_engine.pdf_worker_count(0, 4) == 2
+    assert pdf_engine.pdf_worker_count(0, 16) == 1
+    assert pdf_engine.pdf_worker_count(3, 4) == 3
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import httpx
+
+from app.clients import product_catalog
+from app.clients.product_catalog import ProductCatalog
+
+PRODUCTS = {"products": [{"id": 1, "title": "Product 1", "price": 1.0, "stock": 10}]}
+
+def _fake_get_json(monkeypatch, responses: list):
+    # Cada llamada consume la siguiente respuesta; una excepción simula DummyJSON caído
+    calls = []
+
+    async def get_json(path, params=None):
+        calls.append(path)
+        await asyncio.sleep(0.01)
+        response = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return 200, response
+
+    monkeypatch.setattr(product_catalog, "get_json", get_json)
+    return calls
+
+def test_cold_catalog_is_downloaded_once_for_concurrent_requests(monkeypatch):
+    calls = _fake_get_json(monkeypatch, [PRODUCTS])
+    catalog = ProductCatalog()
+
+    async def scenario():
+        return await asyncio.gather(*(catalog.ensure_loaded() for _ in range(20)))
+
+    assert asyncio.run(scenario()) == [True] * 20
+    assert len(calls) == 1
+
+def test_failed_download_is_not_retried_until_the_cooldown_passes(monkeypatch):
+    calls = _fake_get_json(monkeypatch, [httpx.ConnectError("down"), PRODUCTS])
+    catalog = ProductCatalog(retry_seconds=0.2)
+
+    async def scenario():
+        concurrent = await asyncio.gather(*(catalog.ensure_loaded() for _ in range(20)))
+        later = await catalog.ensure_loaded()
+        time.sleep(0.25)
+        return concurrent, later, await catalog.ensure_loaded()
+
+    concurrent, later, after_cooldown = asyncio.run(scenario())
+    assert concurrent == [False] * 20
+    assert later is False
+    assert after_cooldown is True
+    assert len(calls) == 2
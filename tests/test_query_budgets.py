@@ -0,0 +1,49 @@
+# Presupuesto de consultas de los caminos calientes: un test falla si un cambio añade sentencias,
+# llamadas a DummyJSON o un patrón N+1. En SQLite update_order lee la cantidad anterior antes del
+# UPDATE (en Postgres va en el mismo UPDATE ... RETURNING), de ahí una sentencia más
+
+def test_list_orders(client, make_customer, auth_headers, query_budget):
+    _, admin = make_customer(role="admin")
+    _, username = make_customer(orders=60)
+
+    with query_budget(sql=1, redis=0, http=0, n_plus_one=0):
+        assert client.get("/orders/", params={"limit": 50}, headers=auth_headers(admin, "admin")).status_code == 200
+    with query_budget(sql=1, redis=0, http=0, n_plus_one=0):
+        response = client.get("/orders/", params={"limit": 50}, headers=auth_headers(username))
+    with query_budget(sql=1, redis=0, http=0, n_plus_one=0):
+        cursor = response.headers["X-Next-Cursor"]
+        assert client.get("/orders/", params={"limit": 50, "cursor": cursor}, headers=auth_headers(username)).status_code == 200
+
+def test_update_order(client, make_customer, auth_headers, query_budget):
+    _, username = make_customer(orders=1)
+    headers = auth_headers(username)
+    order_id = client.get("/orders/", headers=headers).json()[0]["id"]
+
+    # UPDATE ... RETURNING y el upsert de las estadísticas
+    with query_budget(sql=3, redis=0, http=0, n_plus_one=0):
+        assert client.put(f"/orders/{order_id}", json={"quantity": 4}, headers=headers).status_code == 200
+    # Pedido de otro cliente: el UPDATE no afecta a ninguna fila y un EXISTS decide 403
+    with query_budget(sql=3, redis=0, http=0, n_plus_one=0):
+        assert client.put(f"/orders/{order_id}", json={"quantity": 4}, headers=auth_headers("someone_else")).status_code == 403
+
+def test_delete_order(client, make_customer, auth_headers, query_budget):
+    _, username = make_customer(orders=1)
+    headers = auth_headers(username)
+    order_id = client.get("/orders/", headers=headers).json()[0]["id"]
+
+    with query_budget(sql=2, redis=0, http=0, n_plus_one=0):
+        assert client.delete(f"/orders/{order_id}", headers=headers).status_code == 200
+    with query_budget(sql=2, redis=0, http=0, n_plus_one=0):
+        assert client.delete(f"/orders/{order_id}", headers=headers).status_code == 404
+
+def test_delete_user(client, make_customer, auth_headers, query_budget):
+    _, admin = make_customer(role="admin")
+    admin_headers = auth_headers(admin, "admin")
+    user_id, _ = make_customer()
+    busy_user_id, _ = make_customer(orders=50)
+
+    # Usuario, EXISTS sobre sus pedidos y DELETE: no se leen ni se enriquecen los pedidos
+    with query_budget(sql=3, redis=0, http=0, n_plus_one=0):
+        assert client.delete(f"/users/{user_id}", headers=admin_headers).status_code == 200
+    with query_budget(sql=2, redis=0, http=0, n_plus_one=0):
+        assert client.delete(f"/users/{busy_user_id}", headers=admin_headers).status_code == 409
@@ -0,0 +1,42 @@
+from sqlmodel import select
+
+from app.db.database import engine
+from app.db.query_plans import _explain, check_query_plans, full_scans
+from app.models.order import Order
+
+def test_hot_path_queries_use_index_lookups_or_ranges(database):
+    assert check_query_plans() == {}
+
+def test_sqlite_scan_using_index_is_a_full_scan(database):
+    # ORDER BY sobre el índice sin condición sobre él: SQLite recorre el índice entero ("SCAN ... USING INDEX")
+    statement = select(Order).where(Order.quantity > 1).order_by(Order.created_at, Order.id)
+    with engine.connect() as conn:
+        plan = _explain(conn, statement)
+    assert any("USING INDEX" in line for line in plan), plan
+    assert full_scans(plan)
+
+def test_sqlite_search_with_range_is_not_a_full_scan():
+    assert full_scans(["SEARCH order USING INDEX ix_order_created_at_id (created_at>?)"]) == []
+    assert full_scans(["SCAN CONSTANT ROW"]) == []
+
+def test_postgres_index_scan_needs_an_index_cond():
+    walk = [
+        "Limit  (cost=0.29..0.61 rows=10 width=52)",
+        "  ->  Index Scan using ix_order_created_at_id on \"order\"  (cost=0.29..3250.29 rows=100000 width=52)",
+        "        Filter: (quantity > 1)",
+    ]
+    seek = [
+        "Limit  (cost=0.29..0.61 rows=10 width=52)",
+        "  ->  Index Scan using ix_order_created_at_id on \"order\"  (cost=0.29..3250.29 rows=100000 width=52)",
+        "        Index Cond: (ROW(created_at, id) > ROW('2024-01-01 00:00:00'::timestamp without time zone, 1))",
+    ]
+    nested = [
+        "Nested Loop  (cost=0.57..16.61 rows=1 width=52)",
+        "  ->  Index Scan using ix_user_username on \"user\"  (cost=0.28..8.29 rows=1 width=4)",
+        "        Index Cond: ((username)::text = 'user_customer'::text)",
+        "  ->  Index Only Scan using ix_order_user_id on \"order\"  (cost=0.29..8.31 rows=1 width=52)",
+    ]
+    assert full_scans(walk) == [walk[1].strip().lstrip("->").strip()]
+    assert full_scans(seek) == []
+    assert full_scans(nested) == [nested[3].strip().lstrip("->").strip()]
+    assert full_scans(["Seq Scan on \"order\"  (cost=0.00..1834.00 rows=100000 width=52)"])
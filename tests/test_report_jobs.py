@@ -0,0 +1,119 @@
+import asyncio
+import csv
+import io
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import pytest
+
+from app.services import data_version, report_jobs
+from app.utils.processes import process_key
+
+def test_artifact_key_follows_database_state_not_version_counter(client, make_customer, auth_headers, wait_job):
+    _, username = make_customer(orders=3)
+    headers = auth_headers(username)
+
+    first = client.post(f"/orders/{username}/exports", params={"format": "csv"}, headers=headers).json()
+    assert wait_job(first["job_id"], headers)["status"] == "done"
+
+    # Sin cambios: el artefacto se reutiliza al instante
+    repeated = client.post(f"/orders/{username}/exports", params={"format": "csv"}, headers=headers).json()
+    assert repeated["status"] == "done"
+    assert repeated["key"] == first["key"]
+
+    # Una cantidad modificada y un contador de versiones reiniciado (reinicio del proceso o de Redis)
+    # no pueden volver a servir el artefacto anterior
+    order_id = client.get("/orders/", headers=headers).json()[0]["id"]
+    assert client.put(f"/orders/{order_id}", json={"quantity": 9}, headers=headers).status_code == 200
+    data_version._local_versions.clear()
+
+    updated = client.post(f"/orders/{username}/exports", params={"format": "csv"}, headers=headers).json()
+    assert updated["key"] != first["key"]
+    assert wait_job(updated["job_id"], headers)["status"] == "done"
+    rows = csv.DictReader(io.StringIO(client.get(f"/orders/exports/{updated['job_id']}/download", headers=headers).text))
+    assert {row["id"]: row["quantity"] for row in rows}[str(order_id)] == "9"
+
+@pytest.fixture
+def jobs_state(tmp_path, monkeypatch):
+    # Cola, workers y directorio propios: los del cliente de pruebas no se tocan
+    monkeypatch.setattr(report_jobs, "REPORTS_DIR", str(tmp_path))
+    monkeypatch.setattr(report_jobs, "_queue", None)
+    monkeypatch.setattr(report_jobs, "_workers", [])
+    monkeypatch.setattr(report_jobs, "_prune_task", None)
+    os.makedirs(report_jobs._jobs_dir())
+    return tmp_path
+
+def _job(owner: str = None, status: str = "pending") -> dict:
+    job_id = str(uuid.uuid4())
+    return {
+        "job_id": job_id, "customer_name": "customer", "format": "csv", "skip": 0, "limit": None,
+        "key": job_id, "status": status, "owner": owner or process_key(), "error": None,
+        "created_at": time.time(), "finished_at": None
+    }
+
+def _stored(job: dict) -> dict:
+    return report_jobs.get_report_job(job["job_id"], {"sub": "admin", "role": "admin"})
+
+def test_shutdown_fails_running_and_queued_jobs(jobs_state, monkeypatch):
+    monkeypatch.setattr(report_jobs, "REPORT_WORKERS", 1)
+    async def never_finishes(job):
+        await asyncio.sleep(3600)
+    monkeypatch.setattr(report_jobs, "_render", never_finishes)
+    running, queued = _job(), _job()
+
+    async def scenario():
+        await report_jobs.start_report_workers()
+        for job in (running, queued):
+            report_jobs._save_job(job)
+            report_jobs._queue.put_nowait(job)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert _stored(running)["status"] == "running"
+        await report_jobs.stop_report_workers()
+
+    asyncio.run(scenario())
+    for job in (running, queued):
+        stored = _stored(job)
+        assert stored["status"] == "failed"
+        assert stored["error"] == report_jobs.INTERRUPTED_ERROR
+        assert stored["finished_at"] is not None
+
+def test_jobs_of_a_dead_process_are_reported_as_failed(jobs_state):
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    orphan, alive = _job(owner=f"{finished.pid}-1", status="running"), _job()
+    report_jobs._save_job(orphan)
+    report_jobs._save_job(alive)
+
+    assert _stored(orphan)["status"] == "failed"
+    assert _stored(orphan)["error"] == report_jobs.INTERRUPTED_ERROR
+    assert _stored(alive)["status"] == "pending"
+
+def test_expired_artifacts_are_pruned_while_running(jobs_state, monkeypatch):
+    monkeypatch.setattr(report_jobs, "REPORT_ARTIFACT_TTL_SECONDS", 2)
+    stale, fresh = jobs_state / "stale.csv", jobs_state / "fresh.csv"
+
+    async def scenario():
+        await report_jobs.start_report_workers()
+        try:
+            # Después del borrado del arranque: solo el periódico puede quitarlo
+            stale.write_text("old")
+            fresh.write_text("new")
+            os.utime(stale, (time.time() - 60, time.time() - 60))
+            await asyncio.sleep(1.5)
+        finally:
+            await report_jobs.stop_report_workers()
+
+    asyncio.run(scenario())
+    assert not stale.exists()
+    assert fresh.exists()
+
+def test_export_submit_validates_skip_and_limit(client, make_customer, auth_headers):
+    _, username = make_customer(orders=1)
+    headers = auth_headers(username)
+    for params in ({"limit": 0}, {"limit": -1}, {"skip": -1}):
+        assert client.post(f"/orders/{username}/exports", params={"format": "csv", **params}, headers=headers).status_code == 422
+        assert client.get(f"/orders/{username}/csv", params=params, headers=headers).status_code == 422
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+from app.utils.response_cache import ResponseCache
+
+ENTRY = {"body": "[]", "etag": '"x"', "headers": {}}
+
+def test_no_local_tier_without_shared_versions():
+    # Sin Redis ni RESPONSE_CACHE_LOCAL nada se guarda: otro worker podría haber cambiado los datos
+    cache = ResponseCache(local=False)
+
+    async def scenario():
+        await cache.set("key", ENTRY)
+        return await cache.get("key")
+
+    assert asyncio.run(scenario()) is None
+
+def test_local_entries_expire_after_ttl():
+    cache = ResponseCache(ttl=0.05, local=True)
+
+    async def scenario():
+        await cache.set("key", ENTRY)
+        fresh = await cache.get("key")
+        time.sleep(0.06)
+        return fresh, await cache.get("key")
+
+    fresh, expired = asyncio.run(scenario())
+    assert fresh == ENTRY
+    assert expired is None
+    assert "key" not in cache._local
+
+def test_local_tier_evicts_least_recently_used():
+    cache = ResponseCache(max_size=2, local=True)
+
+    async def scenario():
+        await cache.set("a", ENTRY)
+        await cache.set("b", ENTRY)
+        await cache.get("a")
+        await cache.set("c", ENTRY)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [ENTRY, None, ENTRY]
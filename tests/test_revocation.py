@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from app.auth import revocation
+from app.auth.revocation import REVOCATION_CHANNEL, REVOCATION_KEY_PREFIX, RevocationRegistry
+from benchmarks.fakes import FakeRedis
+
+EXP = int(time.time()) + 600
+
+class RacingRedis(FakeRedis):
+    # Otro worker revoca un token justo después del SCAN inicial de este
+    async def scan_iter(self, match: str = "*", count: int = None):
+        async for key in super().scan_iter(match, count):
+            yield key
+        if not await self.exists(f"{REVOCATION_KEY_PREFIX}during-scan"):
+            await self.set(f"{REVOCATION_KEY_PREFIX}during-scan", "revoked", ex=600)
+            await self.publish(REVOCATION_CHANNEL, f"during-scan:{EXP}")
+
+def test_revocation_published_during_initial_load_is_not_lost(monkeypatch):
+    redis = RacingRedis()
+    monkeypatch.setattr(revocation, "redis_client", redis)
+    registry = RevocationRegistry()
+
+    async def scenario():
+        await redis.set(f"{REVOCATION_KEY_PREFIX}before-start", "revoked", ex=600)
+        await registry.start()
+        # El mensaje publicado durante el SCAN se procesa en cuanto el suscriptor vuelve al canal
+        for _ in range(10):
+            await asyncio.sleep(0)
+        try:
+            return await registry.is_revoked("before-start", EXP), await registry.is_revoked("during-scan", EXP)
+        finally:
+            await registry.stop()
+
+    assert asyncio.run(scenario()) == (True, True)
+
+def test_revocation_published_after_start_reaches_other_workers(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(revocation, "redis_client", redis)
+    worker, other_worker = RevocationRegistry(), RevocationRegistry()
+
+    async def scenario():
+        await worker.start()
+        await other_worker.start()
+        await worker.revoke("after-start", EXP)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        try:
+            return await other_worker.is_revoked("after-start", EXP)
+        finally:
+            await worker.stop()
+            await other_worker.stop()
+
+    assert asyncio.run(scenario()) is True
+
+def _legacy_token(sub: str, exp: int = EXP) -> str:
+    # Token de antes de `jti`: se revocaba guardándolo completo
+    from jose import jwt
+    from app.auth.jwt import ALGORITHM, SECRET_KEY
+    return jwt.encode({"sub": sub, "role": "customer", "exp": exp}, SECRET_KEY, algorithm=ALGORITHM)
+
+def test_revocations_in_the_previous_file_format_still_apply(monkeypatch, tmp_path):
+    from app.auth.jwt import token_id
+    legacy, expired = _legacy_token("legacy"), _legacy_token("expired", exp=int(time.time()) - 60)
+    path = tmp_path / "revoked_tokens.txt"
+    path.write_text(f"{legacy}\n{expired}\nnot-a-token\nnew-jti {EXP}\n")
+    monkeypatch.setattr(revocation, "REVOKED_TOKENS_FILE", str(path))
+    monkeypatch.setattr(revocation, "redis_client", None)
+    registry = RevocationRegistry()
+    registry.load_file()
+
+    payload = {"sub": "legacy", "exp": EXP}
+    assert asyncio.run(registry.is_revoked(token_id(legacy, payload), EXP)) is True
+    assert asyncio.run(registry.is_revoked("new-jti", EXP)) is True
+    # Reescrito en el formato nuevo: el token sigue revocado en el siguiente arranque
+    assert path.read_text().splitlines() == [f"{revocation.token_digest(legacy)} {EXP}", f"new-jti {EXP}"]
+    reloaded = RevocationRegistry()
+    reloaded.load_file()
+    assert asyncio.run(reloaded.is_revoked(token_id(legacy, payload), EXP)) is True
+
+def test_revocations_under_the_previous_redis_key_still_apply(monkeypatch):
+    from app.auth.jwt import token_id
+    legacy = _legacy_token("legacy-redis")
+    redis = FakeRedis()
+    monkeypatch.setattr(revocation, "redis_client", redis)
+    registry = RevocationRegistry()
+
+    async def scenario():
+        await redis.set(legacy, "revoked", ex=600)
+        await registry.start()
+        try:
+            return await registry.is_revoked(token_id(legacy, {"exp": EXP}), EXP)
+        finally:
+            await registry.stop()
+
+    assert asyncio.run(scenario()) is True
+    assert asyncio.run(redis.exists(f"{REVOCATION_KEY_PREFIX}{revocation.token_digest(legacy)}")) == 1
@@ -0,0 +1,37 @@
+import logging
+
+from sqlalchemy import select, update
+
+from app.db.database import engine
+from app.models.order import Order
+from app.models.sales import SalesSummary
+
+def _customer_summary(user_id: int) -> tuple:
+    with engine.connect() as conn:
+        return conn.execute(
+            select(SalesSummary.units, SalesSummary.revenue, SalesSummary.orders)
+            .where(SalesSummary.dimension == "customer", SalesSummary.bucket == str(user_id))
+        ).first()
+
+def test_order_writes_without_a_price_still_reach_the_summary(client, make_customer, auth_headers, caplog):
+    user_id, username = make_customer(orders=1)
+    headers = auth_headers(username)
+    order_id = client.get("/orders/", headers=headers).json()[0]["id"]
+    # Pedido anterior al snapshot de un producto que ya no existe en el catálogo
+    with engine.begin() as conn:
+        conn.execute(update(Order).where(Order.id == order_id).values(product_id=999, product_title=None, unit_price=None, quantity=2))
+
+    with caplog.at_level(logging.WARNING, logger="app.services.order"):
+        assert client.put(f"/orders/{order_id}", json={"quantity": 5}, headers=headers).status_code == 200
+        assert _customer_summary(user_id) == (3, 0.0, 0)
+        assert client.delete(f"/orders/{order_id}", headers=headers).status_code == 200
+        assert _customer_summary(user_id) == (-2, 0.0, -1)
+    assert sum("no price for product 999" in record.getMessage() for record in caplog.records) == 2
+
+def test_top_n_limit_is_bounded(client, make_customer, auth_headers):
+    _, admin = make_customer(role="admin")
+    headers = auth_headers(admin, "admin")
+    for path in ("/orders/stats/products", "/orders/stats/customers"):
+        assert client.get(path, headers=headers).status_code == 200
+        for limit in (0, -1, 101):
+            assert client.get(path, params={"limit": limit}, headers=headers).status_code == 422
@@ -0,0 +1,61 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="server.py only preloads the app with fork")
+def test_preforked_workers_log_and_stop_on_sigterm(tmp_path):
+    # Dos workers creados con fork: sus registros llegan a la salida una sola vez y SIGTERM los para a tiempo
+    port = _free_port()
+    env = dict(os.environ, WEB_GRACEFUL_TIMEOUT="10", LOG_SAMPLE_RATE="1.0", PDF_WORKERS="0")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py"), "--workers", "2", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=tmp_path, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            assert time.monotonic() < deadline, "server did not start"
+            time.sleep(0.2)
+        for _ in range(5):
+            assert httpx.get(f"http://127.0.0.1:{port}/", timeout=5).status_code == 200
+
+        # Deja que el segundo worker termine de arrancar antes de pararlo
+        time.sleep(1)
+        started = time.monotonic()
+        process.send_signal(signal.SIGTERM)
+        output, _ = process.communicate(timeout=20)
+        stopped_in = time.monotonic() - started
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.communicate()
+
+    assert process.returncode == 0, output
+    assert stopped_in < 10, output
+    assert output.count("Listening on") == 1, output
+    # Pool de PDF por worker: los núcleos repartidos entre los dos workers
+    assert f"with 2 workers, {max(1, (os.cpu_count() or 1) // 2)} PDF processes each" in output, output
+    assert output.count("Started worker") == 2, output
+    assert output.count("Application startup") == 2, output
+    assert output.count("Application shutdown") == 2, output
+    assert output.count("GET / - 200") == 6, output
+    assert "did not stop in time" not in output
+    assert (tmp_path / "app.log").read_text().count("Application startup") == 2